@@ -1,47 +1,107 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
-from datetime import datetime, timedelta
-import json
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, make_response
+from flask.sessions import (FileSessionStore, MemorySessionStore, SQLiteSessionStore,
+                            ServerSideSessionInterface)
+from datetime import datetime, timedelta, timezone
+from collections.abc import Iterator
+from functools import wraps
+import hashlib
+import math
 import os
-from werkzeug.security import generate_password_hash, check_password_hash
+import secrets
+import time
+import urllib.error
+import click
+from werkzeug.security import generate_password_hash
+from storage import create_file_if_not_exists, load_data
+from autocomplete import AutocompleteIndex
+from catalog_store import CatalogStore, JsonBookStorage
+from data_generator import generate_dataset, write_json, write_sqlite
+from fragment_cache import FragmentCacheExtension
+from metrics import RequestMetrics
+from pagination import paginate
+from profiler import MIN_INTERVAL, ProfilerBusy, SamplingProfiler, collapse, fetch_profile
+from password_hasher import HasherBusy, PasswordHasher
+from response_cache import ResponseCache
+from search_index import SearchIndex
+from sort_index import SORT_KEYS, SortIndex
+from streaming import render_stream, stream_flush
+from theme_index import ThemeIndex
+from tracing import RequestTracer, span
+from sqlite_storage import SQLiteBookStorage, SQLiteDatabase, SQLiteUserRepository, migrate_from_json
+from user_repository import EmailTaken, UserRepository, default_notifications
 
 app = Flask(__name__)
+# Тег {% cache %} для карточек книг; задается до первого обращения к app.jinja_env
+app.jinja_options = {**app.jinja_options, 'extensions': [FragmentCacheExtension]}
 app.secret_key = 'school_library_secret_key_2024'
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=7)
+# Журнал изменений пользователей: каждое действие дописывает строку в
+# users.json.wal вместо перезаписи users.json целиком
+app.config['USERS_JOURNAL'] = False
+app.config['USERS_JOURNAL_MAX_BYTES'] = 1024 * 1024
+# Хранилище данных: 'json' (users.json и books.json) или 'sqlite'
+app.config['STORAGE_BACKEND'] = 'json'
+app.config['SQLITE_DATABASE'] = 'library.db'
+# Размер страницы каталога по умолчанию и максимальный размер
+app.config['CATALOG_PAGE_SIZE'] = 24
+app.config['CATALOG_MAX_PAGE_SIZE'] = 100
+# Кэш страниц для гостей: время жизни в секундах (0 - выключен) и число страниц
+app.config['RESPONSE_CACHE_TTL'] = 60
+app.config['RESPONSE_CACHE_SIZE'] = 256
+# Сколько отрисованных карточек книг хранить в кэше фрагментов
+app.config['FRAGMENT_CACHE_SIZE'] = 4096
+# Страницы, где не меньше STREAM_MIN_BOOKS книг, отправляются потоком:
+# сначала шапка и фильтры, затем карточки по STREAM_CHUNK_BOOKS штук.
+# Порог равен размеру страницы каталога, поэтому полная страница
+# каталога по умолчанию идет потоком, а короткие выдачи - целиком
+app.config['STREAM_TEMPLATES'] = True
+app.config['STREAM_MIN_BOOKS'] = 24
+app.config['STREAM_CHUNK_BOOKS'] = 12
+# Скомпилированные шаблоны хранятся в instance/jinja_cache, чтобы новые
+# процессы не компилировали их заново (заполняется flask compile-templates)
+app.config['TEMPLATES_BYTECODE_CACHE'] = 'jinja_cache'
+# Хеширование паролей: метод для generate_password_hash (например
+# 'scrypt:32768:8:1' или 'pbkdf2:sha256:600000'), число потоков пула,
+# длина очереди, после которой вход отвечает 503, и время ожидания
+app.config['PASSWORD_HASH_METHOD'] = 'scrypt'
+app.config['PASSWORD_HASH_WORKERS'] = 2
+app.config['PASSWORD_HASH_QUEUE'] = 16
+app.config['PASSWORD_HASH_TIMEOUT'] = 10
+app.config['PASSWORD_HASH_RETRY_AFTER'] = 5
+# Где хранятся сессии: 'cookie' (подписанная cookie), 'memory' (память
+# процесса), 'sqlite' (SESSION_DATABASE) или 'file' (SESSION_DIRECTORY).
+# Кроме 'cookie', в cookie передается только случайный id сессии, который
+# меняется при входе, регистрации и выходе
+app.config['SESSION_BACKEND'] = 'cookie'
+app.config['SESSION_DATABASE'] = 'sessions.db'
+app.config['SESSION_DIRECTORY'] = 'sessions'
+# Заголовок Server-Timing с временем этапов запроса (хранилище, индексы,
+# шаблоны, сессия) и порог в секундах, после которого запрос попадает в
+# журнал медленных запросов (None - журнал выключен)
+app.config['SERVER_TIMING'] = True
+app.config['SLOW_REQUEST_THRESHOLD'] = 0.5
+# Профилировщик /admin/profile: интервал между выборками стеков и
+# наибольшая длительность одного профилирования, в секундах
+app.config['PROFILER_INTERVAL'] = 0.005
+app.config['PROFILER_MAX_SECONDS'] = 60
+# Любую настройку можно переопределить переменной окружения с префиксом
+# LIBRARY_, например LIBRARY_STORAGE_BACKEND=sqlite или
+# LIBRARY_USERS_JOURNAL=true (значение разбирается как JSON, если получится)
+app.config.from_prefixed_env('LIBRARY')
+
+# Метрики запросов подключаются первыми, чтобы before_request других
+# обработчиков тоже попадал во время ответа
+request_metrics = RequestMetrics()
+request_metrics.init_app(app)
+# Профилировщику нужно знать, какой запрос обрабатывает каждый поток
+sampling_profiler = SamplingProfiler(interval=app.config['PROFILER_INTERVAL'])
+sampling_profiler.init_app(app)
 
 # Константы для файлов
 USERS_FILE = 'users.json'
 BOOKS_FILE = 'books.json'
 
-def create_file_if_not_exists(filename, default_data):
-    """Создает файл если он не существует"""
-    if not os.path.exists(filename):
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(default_data, f, ensure_ascii=False, indent=2)
-        print(f"Создан файл: {filename}")
-    return True
-
-def load_data(filename):
-    """Загружает данные из JSON файла"""
-    try:
-        if os.path.exists(filename):
-            with open(filename, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return None
-    except Exception as e:
-        print(f"Ошибка загрузки {filename}: {e}")
-        return None
-
-def save_data(filename, data):
-    """Сохраняет данные в JSON файл"""
-    try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        return True
-    except Exception as e:
-        print(f"Ошибка сохранения {filename}: {e}")
-        return False
-
-def ensure_available_field(books):
+def ensure_available_field(books, book_storage):
     """Добавляет поле available во все книги, если его нет"""
     updated = False
     for book in books:
@@ -49,59 +109,241 @@ def ensure_available_field(books):
             book['available'] = True
             updated = True
     if updated:
-        save_data(BOOKS_FILE, books)
+        book_storage.save_all(books)
         print("Добавлено поле 'available' в книги")
     return books
 
-def initialize_application():
-    """Инициализирует приложение - создает файлы и тестовые данные"""
-    print("Инициализация приложения...")
+def create_storage():
+    """Создает хранилища пользователей и книг согласно STORAGE_BACKEND"""
+    if app.config['STORAGE_BACKEND'] == 'sqlite':
+        database = SQLiteDatabase(app.config['SQLITE_DATABASE'])
+        return SQLiteUserRepository(database), SQLiteBookStorage(database)
     
     # Создаем файлы если их нет
     create_file_if_not_exists(USERS_FILE, {})
     create_file_if_not_exists(BOOKS_FILE, [])
+    users = UserRepository(USERS_FILE,
+                           journal=app.config['USERS_JOURNAL'],
+                           journal_max_bytes=app.config['USERS_JOURNAL_MAX_BYTES'])
+    return users, JsonBookStorage(BOOKS_FILE)
+
+def create_session_interface():
+    """Создает хранилище сессий согласно SESSION_BACKEND (None - сессии в cookie)"""
+    backend = app.config['SESSION_BACKEND']
+    if backend == 'memory':
+        store = MemorySessionStore()
+    elif backend == 'sqlite':
+        store = SQLiteSessionStore(app.config['SESSION_DATABASE'])
+    elif backend == 'file':
+        store = FileSessionStore(app.config['SESSION_DIRECTORY'])
+    else:
+        return None
+    return ServerSideSessionInterface(store)
+
+def initialize_application():
+    """Инициализирует приложение - создает файлы и тестовые данные"""
+    print("Инициализация приложения...")
+    
+    users, book_storage = create_storage()
     
     # Загружаем книги
-    books = load_data(BOOKS_FILE)
+    books = book_storage.load()
     if not books or len(books) == 0:
-        print("ВНИМАНИЕ: Файл books.json пуст или не найден!")
+        print("ВНИМАНИЕ: Каталог книг пуст или не найден!")
         books = []
-        save_data(BOOKS_FILE, books)
+        book_storage.save_all(books)
     else:
         # Добавляем поле available, если его нет
-        books = ensure_available_field(books)
-    
-    # Загружаем пользователей
-    users = load_data(USERS_FILE)
-    if not users or len(users) == 0:
-        users = {
-            'admin': {
-                'email': 'admin@school509.ru',
-                'password': generate_password_hash('admin123'),
-                'full_name': 'Администратор Библиотеки',
-                'grade': '11',
-                'registered_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'reading_books': [],
-                'reading_dates': {},
-                'reading_history': [],
-                'history_dates': {},
-                'favorites': [],
-                'notifications': {
-                    'new_books': True,
-                    'return_reminders': True,
-                    'recommendations': False
-                }
-            }
-        }
-        save_data(USERS_FILE, users)
+        books = ensure_available_field(books, book_storage)
+    
+    # Проверяем пользователей
+    if len(users) == 0:
+        users.create('admin', {
+            'email': 'admin@school509.ru',
+            'password': generate_password_hash('admin123', app.config['PASSWORD_HASH_METHOD']),
+            'full_name': 'Администратор Библиотеки',
+            'grade': '11',
+            'registered_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'reading_books': [],
+            'reading_dates': {},
+            'reading_history': [],
+            'history_dates': {},
+            'favorites': [],
+            'notifications': default_notifications()
+        })
         print("Создан тестовый пользователь: admin / admin123")
     
     print(f"Загружено книг: {len(books)}")
     print(f"Загружено пользователей: {len(users)}")
-    return users, books
+    return users, CatalogStore(book_storage, books)
 
 # Инициализируем приложение один раз при запуске
-users_data, books_data = initialize_application()
+users, books_data = initialize_application()
+
+session_interface = create_session_interface()
+if session_interface is not None:
+    app.session_interface = session_interface
+
+# Трассировка оборачивает уже выбранный интерфейс сессий
+request_tracer = RequestTracer(threshold=app.config['SLOW_REQUEST_THRESHOLD'],
+                               server_timing=app.config['SERVER_TIMING'])
+request_tracer.init_app(app)
+
+# Поисковый индекс обновляется вместе с каталогом
+search_index = SearchIndex()
+search_index.attach(books_data)
+autocomplete_index = AutocompleteIndex(fallback=search_index.search)
+autocomplete_index.attach(books_data)
+theme_index = ThemeIndex()
+theme_index.attach(books_data)
+sort_index = SortIndex()
+sort_index.attach(books_data)
+
+# Готовые страницы для гостей, сбрасываются при изменении каталога
+response_cache = ResponseCache(ttl=app.config['RESPONSE_CACHE_TTL'],
+                               max_entries=app.config['RESPONSE_CACHE_SIZE'])
+response_cache.attach(books_data)
+
+app.jinja_env.fragment_cache.max_entries = app.config['FRAGMENT_CACHE_SIZE']
+
+app.add_template_global(stream_flush)
+
+def render_listing(template_name, book_count, **context):
+    """Отрисовывает страницу со списком книг, большие списки - потоком"""
+    if app.config['STREAM_TEMPLATES'] and book_count >= app.config['STREAM_MIN_BOOKS']:
+        return render_stream(template_name, **context)
+    return render_template(template_name, **context)
+
+@app.template_global()
+def book_version(book_id):
+    """Версия книги для ключей {% cache %}: меняется при каждом изменении книги"""
+    return books_data.version(book_id)[0]
+
+# Пул потоков для хеширования паролей при входе и регистрации
+password_hasher = PasswordHasher(method=app.config['PASSWORD_HASH_METHOD'],
+                                 workers=app.config['PASSWORD_HASH_WORKERS'],
+                                 max_queue=app.config['PASSWORD_HASH_QUEUE'],
+                                 timeout=app.config['PASSWORD_HASH_TIMEOUT'])
+
+def upgrade_password_hash(username, password, old_hash):
+    """Пересчитывает устаревший хеш пароля текущим методом (в пуле хеширования)"""
+    new_hash = generate_password_hash(password, password_hasher.method)
+    user = users.get(username)
+    # Пароль могли сменить или пользователя удалить, пока считался хеш
+    if user is None or user.password_hash != old_hash:
+        return
+    user.password_hash = new_hash
+    if not users.save(user):
+        print(f"Не удалось сохранить новый хеш пароля пользователя {username}")
+
+def hashing_busy_response(template_name, **context):
+    """Ответ 503 с Retry-After, когда очередь хеширования паролей заполнена"""
+    flash('Сервер сейчас перегружен, попробуйте еще раз через несколько секунд', 'error')
+    response = make_response(render_template(template_name, **context), 503)
+    response.retry_after = app.config['PASSWORD_HASH_RETRY_AFTER']
+    return response
+
+def get_current_user():
+    """Возвращает User для пользователя из сессии или None"""
+    if 'user' not in session:
+        return None
+    return users.get(session['user']['username'])
+
+def cache_for_anonymous(view):
+    """Отдает гостям страницу из response_cache.
+
+    Вошедшим пользователям и запросам с flash-сообщениями страница
+    отрисовывается заново, потому что ее содержимое зависит от сессии.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not response_cache.enabled or 'user' in session or '_flashes' in session:
+            return view(*args, **kwargs)
+        
+        key = ResponseCache.make_key(request.endpoint, request.view_args, request.args)
+        page = response_cache.get(key)
+        if page is not None:
+            return page
+        
+        generation = response_cache.generation
+        page = view(*args, **kwargs)
+        # Кэшируем только отрисованные страницы, но не редиректы
+        if isinstance(page, str):
+            if '_flashes' not in session:
+                response_cache.set(key, page, generation)
+        elif isinstance(page, Iterator):
+            page = cache_stream(page, key, generation)
+        return page
+    return wrapper
+
+def cache_stream(stream, key, generation):
+    """Отдает части потоковой страницы и сохраняет ее в кэш, когда поток дошел до конца"""
+    parts = []
+    for part in stream:
+        parts.append(part)
+        yield part
+    response_cache.set(key, ''.join(parts), generation)
+
+# Счетчики версий данных живут в памяти процесса, поэтому ETag
+# включает идентификатор запуска: после перезапуска старые ETag не
+# совпадут, и страницы с новым кодом шаблонов не будут спутаны со старыми
+BOOT_ID = secrets.token_hex(4)
+
+def data_validators(per_user):
+    """Возвращает (ETag, время изменения) по версиям каталога и пользователя из сессии"""
+    version, modified_at = books_data.version()
+    parts = [BOOT_ID, str(version)]
+    if per_user:
+        if 'user' in session:
+            username = session['user']['username']
+            user_version, user_modified_at = users.version(username)
+            parts.append(hashlib.sha1(username.encode('utf-8')).hexdigest()[:12])
+            parts.append(str(user_version))
+            modified_at = max(modified_at, user_modified_at)
+        else:
+            parts.append('guest')
+    return '-'.join(parts), modified_at
+
+def conditional_get(per_user=True):
+    """Отвечает 304 Not Modified, если данные не менялись с прошлого запроса.
+
+    ETag и Last-Modified строятся по версиям данных до вызова view,
+    поэтому совпавший запрос не доходит до отрисовки шаблона. Для
+    per_user=True учитывается и запись пользователя из сессии.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Страница с flash-сообщением показывается один раз
+            if per_user and '_flashes' in session:
+                return view(*args, **kwargs)
+            
+            etag, modified_at = data_validators(per_user)
+            last_modified = datetime.fromtimestamp(int(modified_at), timezone.utc)
+            
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            else:
+                not_modified = (request.if_modified_since is not None
+                                and last_modified <= request.if_modified_since)
+            if not_modified:
+                response = app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            # Браузер может хранить страницу, но должен проверять ее при каждом показе
+            response.cache_control.no_cache = True
+            if per_user:
+                response.vary.add('Cookie')
+                if 'user' in session:
+                    response.cache_control.private = True
+            return response
+        return wrapper
+    return decorator
 
 # Фильтры для шаблонов
 @app.template_filter('to_date')
@@ -137,17 +379,15 @@ def format_date_filter(d):
 
 # Маршруты приложения
 @app.route('/')
+@conditional_get()
+@cache_for_anonymous
 def index():
     """Главная страница"""
     # Список ID рекомендованных книг
     recommended_ids = [5, 26, 14]  # ID: 5 - Капитанская дочка, 26 - Судьба человека, 14 - Преступление и наказание
     
     # Получаем рекомендованные книги по ID
-    featured_books = []
-    for book_id in recommended_ids:
-        book = next((b for b in books_data if b['id'] == book_id), None)
-        if book:
-            featured_books.append(book)
+    featured_books = books_data.get_many(recommended_ids)
     
     # Если какие-то книги не найдены, добавляем первые три из каталога
     if len(featured_books) < 3:
@@ -161,42 +401,75 @@ def index():
                          user=session.get('user'),
                          total_books=len(books_data))
 
+def find_book_ids(search, theme, sort):
+    """Возвращает (id книг каталога по фильтрам в нужном порядке, id найденных поиском или None)"""
+    with span('index'):
+        return _find_book_ids(search, theme, sort)
+
+def _find_book_ids(search, theme, sort):
+    found_ids = None
+    if search:
+        # Без сортировки результаты поиска упорядочены по релевантности
+        found_ids = search_index.search(search)
+    
+    if theme:
+        # Фильтрация по теме (проверяем, входит ли искомая тема в массив тем книги)
+        theme_ids = theme_index.books_for(theme)
+        if found_ids is None:
+            book_ids = sort_index.sort_ids(theme_ids, sort)
+        else:
+            book_ids = [i for i in found_ids if i in theme_ids]
+            if sort:
+                book_ids = sort_index.sort_ids(book_ids, sort)
+    elif found_ids is not None:
+        book_ids = sort_index.sort_ids(found_ids, sort) if sort else found_ids
+    else:
+        book_ids = sort_index.order(sort)
+    return book_ids, found_ids
+
+def get_page_args():
+    """Читает sort, page, limit и cursor из запроса"""
+    sort = request.args.get('sort', '')
+    if sort not in SORT_KEYS:
+        sort = ''
+    page = request.args.get('page', 1, type=int)
+    limit = request.args.get('limit', app.config['CATALOG_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, app.config['CATALOG_MAX_PAGE_SIZE']))
+    return sort, page, limit, request.args.get('cursor')
+
 @app.route('/catalog')
+@conditional_get()
+@cache_for_anonymous
 def catalog():
     """Страница каталога книг"""
     theme = request.args.get('theme', '')
     search = request.args.get('search', '')
+    sort, page, limit, cursor = get_page_args()
     
-    filtered_books = books_data
-    
-    if search:
-        filtered_books = [book for book in books_data 
-                         if search.lower() in book['title'].lower() 
-                         or search.lower() in book['author'].lower()]
-    
-    if theme:
-        # Фильтрация по теме (проверяем, входит ли искомая тема в массив тем книги)
-        filtered_books = [book for book in filtered_books 
-                         if any(theme.lower() in t.lower() for t in book['theme'])]
+    book_ids, found_ids = find_book_ids(search, theme, sort)
+    rank = sort_index.rank(sort) if not (search or theme) else None
+    pagination = paginate(book_ids, page=page, limit=limit, cursor=cursor, rank=rank)
     
-    # Получаем все уникальные темы из всех книг (для выпадающего списка)
-    all_themes = []
-    for book in books_data:
-        all_themes.extend(book['theme'])
-    themes = sorted(list(set(all_themes)))
+    # Темы для выпадающего списка и число книг по каждой из них
+    # (при поиске - среди найденных книг)
+    with span('index'):
+        themes = theme_index.themes()
+        theme_counts = theme_index.counts(found_ids)
     
     # Проверяем избранные книги и читаемые книги для текущего пользователя
     user_favorites = []
     user_reading = []
-    if 'user' in session:
-        current_users = load_data(USERS_FILE) or {}
-        user_data = current_users.get(session['user']['username'], {})
-        user_favorites = user_data.get('favorites', [])
-        user_reading = user_data.get('reading_books', [])
-    
-    return render_template('catalog.html', 
-                         books=filtered_books,
+    current_user = get_current_user()
+    if current_user:
+        user_favorites = current_user.favorites
+        user_reading = current_user.reading_books
+    
+    return render_listing('catalog.html', len(pagination.ids),
+                         books=books_data.get_many(pagination.ids),
+                         pagination=pagination,
+                         sort=sort,
                          themes=themes,
+                         theme_counts=theme_counts,
                          search_query=search,
                          selected_theme=theme,
                          user=session.get('user'),
@@ -204,9 +477,11 @@ def catalog():
                          user_reading=user_reading)
 
 @app.route('/book/<int:book_id>')
+@conditional_get()
+@cache_for_anonymous
 def book_detail(book_id):
     """Страница детальной информации о книге"""
-    book = next((b for b in books_data if b['id'] == book_id), None)
+    book = books_data.get(book_id)
     if not book:
         flash('Книга не найдена', 'error')
         return redirect(url_for('catalog'))
@@ -214,13 +489,10 @@ def book_detail(book_id):
     # Проверяем, есть ли книга в избранном и читаемых у пользователя
     is_favorite = False
     is_reading = False
-    if 'user' in session:
-        current_users = load_data(USERS_FILE) or {}
-        user_data = current_users.get(session['user']['username'], {})
-        user_favorites = user_data.get('favorites', [])
-        user_reading = user_data.get('reading_books', [])
-        is_favorite = book_id in user_favorites
-        is_reading = book_id in user_reading
+    current_user = get_current_user()
+    if current_user:
+        is_favorite = current_user.is_favorite(book_id)
+        is_reading = current_user.is_reading(book_id)
     
     return render_template('book_detail.html', 
                          book=book,
@@ -235,20 +507,15 @@ def add_to_favorites(book_id):
         flash('Пожалуйста, войдите в систему', 'error')
         return redirect(url_for('login'))
     
-    current_users = load_data(USERS_FILE) or {}
-    username = session['user']['username']
+    current_user = get_current_user()
     
-    if username not in current_users:
+    if not current_user:
         flash('Ошибка: пользователь не найден', 'error')
         return redirect(url_for('catalog'))
     
     # Добавляем книгу в избранное
-    if 'favorites' not in current_users[username]:
-        current_users[username]['favorites'] = []
-    
-    if book_id not in current_users[username]['favorites']:
-        current_users[username]['favorites'].append(book_id)
-        save_data(USERS_FILE, current_users)
+    if current_user.add_favorite(book_id):
+        users.save(current_user)
         flash('Книга добавлена в избранное!', 'success')
     else:
         flash('Книга уже в избранном', 'info')
@@ -262,17 +529,15 @@ def remove_from_favorites(book_id):
         flash('Пожалуйста, войдите в систему', 'error')
         return redirect(url_for('login'))
     
-    current_users = load_data(USERS_FILE) or {}
-    username = session['user']['username']
+    current_user = get_current_user()
     
-    if username not in current_users:
+    if not current_user:
         flash('Ошибка: пользователь не найден', 'error')
         return redirect(url_for('catalog'))
     
     # Удаляем книгу из избранного
-    if 'favorites' in current_users[username] and book_id in current_users[username]['favorites']:
-        current_users[username]['favorites'].remove(book_id)
-        save_data(USERS_FILE, current_users)
+    if current_user.remove_favorite(book_id):
+        users.save(current_user)
         flash('Книга удалена из избранного', 'info')
     
     return redirect(request.referrer or url_for('profile'))
@@ -284,53 +549,31 @@ def toggle_reading(book_id):
         flash('Пожалуйста, войдите в систему', 'error')
         return redirect(url_for('login'))
     
-    current_users = load_data(USERS_FILE) or {}
-    username = session['user']['username']
+    current_user = get_current_user()
     
-    if username not in current_users:
+    if not current_user:
         flash('Ошибка: пользователь не найден', 'error')
         return redirect(url_for('catalog'))
     
     # Проверяем существование книги
-    book = next((b for b in books_data if b['id'] == book_id), None)
+    book = books_data.get(book_id)
     if not book:
         flash('Книга не найдена', 'error')
         return redirect(url_for('catalog'))
     
-    # Инициализируем списки если их нет
-    if 'reading_books' not in current_users[username]:
-        current_users[username]['reading_books'] = []
-    if 'reading_dates' not in current_users[username]:
-        current_users[username]['reading_dates'] = {}
-    if 'reading_history' not in current_users[username]:
-        current_users[username]['reading_history'] = []
-    if 'history_dates' not in current_users[username]:
-        current_users[username]['history_dates'] = {}
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
     # Проверяем, читает ли пользователь эту книгу сейчас
-    if book_id in current_users[username]['reading_books']:
+    if current_user.is_reading(book_id):
         # Завершаем чтение - перемещаем в историю
-        current_users[username]['reading_books'].remove(book_id)
-        
-        # Сохраняем дату завершения
-        current_users[username]['history_dates'][str(book_id)] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Добавляем в историю чтения, если там еще нет
-        if book_id not in current_users[username]['reading_history']:
-            current_users[username]['reading_history'].append(book_id)
-        
-        # Удаляем дату начала чтения
-        if str(book_id) in current_users[username]['reading_dates']:
-            del current_users[username]['reading_dates'][str(book_id)]
-        
+        current_user.finish_reading(book_id, now)
         flash(f'Вы завершили чтение книги "{book["title"]}". Книга добавлена в историю!', 'success')
     else:
         # Начинаем чтение
-        current_users[username]['reading_books'].append(book_id)
-        current_users[username]['reading_dates'][str(book_id)] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        current_user.start_reading(book_id, now)
         flash(f'Вы начали читать книгу "{book["title"]}"', 'success')
     
-    save_data(USERS_FILE, current_users)
+    users.save(current_user)
     return redirect(request.referrer or url_for('catalog'))
 
 @app.route('/toggle_book_status/<int:book_id>')
@@ -345,18 +588,14 @@ def toggle_book_status(book_id):
         flash('Эта функция доступна только администратору', 'error')
         return redirect(request.referrer or url_for('catalog'))
     
-    # Находим книгу
-    book_index = next((i for i, b in enumerate(books_data) if b['id'] == book_id), None)
-    if book_index is None:
+    # Находим книгу и переключаем статус
+    book = books_data.toggle_available(book_id)
+    if book is None:
         flash('Книга не найдена', 'error')
         return redirect(request.referrer or url_for('catalog'))
     
-    # Переключаем статус
-    books_data[book_index]['available'] = not books_data[book_index]['available']
-    save_data(BOOKS_FILE, books_data)
-    
-    status = "Доступна" if books_data[book_index]['available'] else "На руках"
-    flash(f'Статус книги "{books_data[book_index]["title"]}" изменен на "{status}"', 'success')
+    status = "Доступна" if book['available'] else "На руках"
+    flash(f'Статус книги "{book["title"]}" изменен на "{status}"', 'success')
     
     return redirect(request.referrer or url_for('catalog'))
 
@@ -367,10 +606,9 @@ def clear_history():
         flash('Пожалуйста, войдите в систему', 'error')
         return redirect(url_for('login'))
     
-    current_users = load_data(USERS_FILE) or {}
-    username = session['user']['username']
+    current_user = get_current_user()
     
-    if username not in current_users:
+    if not current_user:
         flash('Ошибка: пользователь не найден', 'error')
         return redirect(url_for('profile'))
     
@@ -382,10 +620,9 @@ def clear_history():
         return redirect(url_for('profile'))
     
     # Очищаем историю чтения
-    current_users[username]['reading_history'] = []
-    current_users[username]['history_dates'] = {}
+    current_user.clear_history()
     
-    save_data(USERS_FILE, current_users)
+    users.save(current_user)
     flash('История чтения успешно очищена!', 'success')
     
     return redirect(url_for('profile'))
@@ -397,40 +634,32 @@ def update_profile():
         flash('Пожалуйста, войдите в систему', 'error')
         return redirect(url_for('login'))
     
-    current_users = load_data(USERS_FILE) or {}
-    username = session['user']['username']
+    current_user = get_current_user()
     
-    if username not in current_users:
+    if not current_user:
         flash('Ошибка: пользователь не найден', 'error')
         return redirect(url_for('profile'))
     
     # Получаем данные из формы
     full_name = request.form.get('full_name')
     new_email = request.form.get('email')
-    current_email = current_users[username].get('email')
-    
-    # Проверяем, изменился ли email
-    if new_email != current_email:
-        # Проверяем, не занят ли новый email другим пользователем
-        email_exists = False
-        for user, user_data in current_users.items():
-            if user != username and user_data.get('email') == new_email:
-                email_exists = True
-                break
-        
-        if email_exists:
-            flash('Этот email уже используется другим пользователем', 'error')
-            return redirect(url_for('profile'))
     
     # Обновляем данные
     if full_name:
-        current_users[username]['full_name'] = full_name
-        session['user']['full_name'] = full_name
+        current_user.full_name = full_name
     
     if new_email:
-        current_users[username]['email'] = new_email
+        current_user.email = new_email
+    
+    # Уникальность email проверяется хранилищем вместе с записью
+    try:
+        users.save(current_user)
+    except EmailTaken:
+        flash('Этот email уже используется другим пользователем', 'error')
+        return redirect(url_for('profile'))
     
-    save_data(USERS_FILE, current_users)
+    if full_name:
+        session['user']['full_name'] = full_name
     flash('Профиль успешно обновлен!', 'success')
     
     return redirect(url_for('profile'))
@@ -442,10 +671,9 @@ def update_notifications():
         flash('Пожалуйста, войдите в систему', 'error')
         return redirect(url_for('login'))
     
-    current_users = load_data(USERS_FILE) or {}
-    username = session['user']['username']
+    current_user = get_current_user()
     
-    if username not in current_users:
+    if not current_user:
         flash('Ошибка: пользователь не найден', 'error')
         return redirect(url_for('profile'))
     
@@ -455,16 +683,13 @@ def update_notifications():
     recommendations = request.form.get('recommendations') == 'on'
     
     # Сохраняем настройки
-    if 'notifications' not in current_users[username]:
-        current_users[username]['notifications'] = {}
-    
-    current_users[username]['notifications'] = {
+    current_user.notifications = {
         'new_books': new_books_notification,
         'return_reminders': return_reminders,
         'recommendations': recommendations
     }
     
-    save_data(USERS_FILE, current_users)
+    users.save(current_user)
     flash('Настройки уведомлений обновлены!', 'success')
     
     return redirect(url_for('profile'))
@@ -480,9 +705,6 @@ def register():
         full_name = request.form['full_name']
         grade = request.form['grade']
         
-        # Загружаем актуальные данные
-        current_users = load_data(USERS_FILE) or {}
-        
         # Проверка совпадения паролей
         if password != confirm_password:
             flash('Пароли не совпадают', 'error')
@@ -492,7 +714,7 @@ def register():
                                  username_error=False)
         
         # Проверка уникальности username
-        if username in current_users:
+        if username in users:
             flash('Пользователь с таким именем уже существует', 'error')
             return render_template('register.html', 
                                  form_data=request.form,
@@ -500,45 +722,48 @@ def register():
                                  username_error=True)
         
         # Проверка уникальности email
-        email_exists = False
-        for user_data in current_users.values():
-            if user_data.get('email') == email:
-                email_exists = True
-                break
-        
-        if email_exists:
+        if users.find_by_email(email) is not None:
             flash('Пользователь с таким email уже зарегистрирован', 'error')
             return render_template('register.html', 
                                  form_data=request.form,
                                  email_error=True,
                                  username_error=False)
         
-        # Создаем нового пользователя
-        current_users[username] = {
-            'email': email,
-            'password': generate_password_hash(password),
-            'full_name': full_name,
-            'grade': grade,
-            'registered_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'reading_books': [],
-            'reading_dates': {},
-            'reading_history': [],
-            'history_dates': {},
-            'favorites': [],
-            'notifications': {
-                'new_books': True,
-                'return_reminders': True,
-                'recommendations': False
-            }
-        }
+        try:
+            password_hash = password_hasher.hash(password)
+        except HasherBusy:
+            return hashing_busy_response('register.html',
+                                         form_data=request.form,
+                                         email_error=False,
+                                         username_error=False)
         
-        if save_data(USERS_FILE, current_users):
+        # Создаем нового пользователя. Email мог занять параллельный
+        # запрос, пока считался хеш, - это проверяет само хранилище
+        try:
+            new_user = users.create(username, {
+                'email': email,
+                'password': password_hash,
+                'full_name': full_name,
+                'grade': grade,
+                'registered_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'reading_books': [],
+                'reading_dates': {},
+                'reading_history': [],
+                'history_dates': {},
+                'favorites': [],
+                'notifications': default_notifications()
+            })
+        except EmailTaken:
+            flash('Пользователь с таким email уже зарегистрирован', 'error')
+            return render_template('register.html', 
+                                 form_data=request.form,
+                                 email_error=True,
+                                 username_error=False)
+        
+        if new_user:
             # Автоматически входим после регистрации
-            session['user'] = {
-                'username': username,
-                'full_name': full_name, 
-                'grade': grade
-            }
+            app.session_interface.regenerate(session)
+            session['user'] = new_user.session_info()
             session.permanent = True
             flash(f'Регистрация успешна! Добро пожаловать, {full_name}!', 'success')
             return redirect(url_for('index'))
@@ -558,17 +783,27 @@ def login():
         username = request.form['username']
         password = request.form['password']
         
-        current_users = load_data(USERS_FILE) or {}
-        user = current_users.get(username)
+        user = users.get(username)
+        
+        password_ok = needs_rehash = False
+        try:
+            if user is not None:
+                password_ok, needs_rehash = password_hasher.verify(user.password_hash, password)
+        except HasherBusy:
+            return hashing_busy_response('login.html')
         
-        if user and check_password_hash(user['password'], password):
-            session['user'] = {
-                'username': username,
-                'full_name': user['full_name'],
-                'grade': user['grade']
-            }
+        if password_ok:
+            # Хеш со старыми параметрами пересчитываем в фоне, ответ его не ждет
+            if needs_rehash:
+                try:
+                    password_hasher.submit(upgrade_password_hash, username, password, user.password_hash)
+                except HasherBusy:
+                    pass
+            # Новый id сессии: id, известный до входа, не даст доступа к аккаунту
+            app.session_interface.regenerate(session)
+            session['user'] = user.session_info()
             session.permanent = True
-            flash(f'Добро пожаловать, {user["full_name"]}!', 'success')
+            flash(f'Добро пожаловать, {user.full_name}!', 'success')
             return redirect(url_for('index'))
         else:
             flash('Неверное имя пользователя или пароль', 'error')
@@ -579,6 +814,7 @@ def login():
 def logout():
     """Выход из системы"""
     session.pop('user', None)
+    app.session_interface.regenerate(session)
     flash('Вы вышли из системы', 'info')
     return redirect(url_for('index'))
 
@@ -589,55 +825,30 @@ def profile():
         flash('Пожалуйста, войдите в систему', 'error')
         return redirect(url_for('login'))
     
-    current_users = load_data(USERS_FILE) or {}
-    user_data = current_users.get(session['user']['username'])
+    user_data = get_current_user()
     
     if not user_data:
         flash('Ошибка загрузки профиля', 'error')
         return redirect(url_for('logout'))
     
-    # Гарантируем наличие всех полей
-    if 'notifications' not in user_data:
-        user_data['notifications'] = {
-            'new_books': True,
-            'return_reminders': True,
-            'recommendations': False
-        }
-    
-    if 'reading_dates' not in user_data:
-        user_data['reading_dates'] = {}
-    
-    if 'history_dates' not in user_data:
-        user_data['history_dates'] = {}
-    
-    if 'reading_history' not in user_data:
-        user_data['reading_history'] = []
-    
     # Загружаем книги которые читает сейчас
-    reading_books_info = []
-    for book_id in user_data.get('reading_books', []):
-        book = next((b for b in books_data if b['id'] == book_id), None)
-        if book:
-            reading_books_info.append(book)
+    reading_books_info = books_data.get_many(user_data.reading_books)
     
     # Загружаем историю чтения
     history_books_info = []
-    for book_id in user_data.get('reading_history', []):
-        book = next((b for b in books_data if b['id'] == book_id), None)
+    for book_id in user_data.reading_history:
+        book = books_data.get(book_id)
         if book:
             history_books_info.append({
                 'book': book,
-                'date': user_data.get('history_dates', {}).get(str(book_id), user_data.get('registered_at'))
+                'date': user_data.history_dates.get(str(book_id), user_data.registered_at)
             })
     
     # Загружаем избранные книги
-    favorite_books_info = []
-    for book_id in user_data.get('favorites', []):
-        book = next((b for b in books_data if b['id'] == book_id), None)
-        if book:
-            favorite_books_info.append(book)
+    favorite_books_info = books_data.get_many(user_data.favorites)
     
-    return render_template('profile.html',
+    return render_listing('profile.html',
+                         len(reading_books_info) + len(history_books_info) + len(favorite_books_info),
                          user=session['user'],
                          user_data=user_data,
                          reading_books=reading_books_info,
@@ -645,6 +856,7 @@ def profile():
                          favorite_books=favorite_books_info)
 
 @app.route('/about')
+@cache_for_anonymous
 def about():
     """Страница 'О нас'"""
     return render_template('about.html', user=session.get('user'))
@@ -663,16 +875,107 @@ def contact():
     return render_template('contact.html', user=session.get('user'))
 
 @app.route('/api/search')
+@conditional_get(per_user=False)
 def api_search():
-    """API для поиска книг"""
+    """API для подсказок поиска: ?q=запрос&limit=число (по умолчанию 5)"""
     query = request.args.get('q', '')
+    limit = request.args.get('limit', 5, type=int)
     if query:
-        results = [book for book in books_data 
-                  if query.lower() in book['title'].lower() 
-                  or query.lower() in book['author'].lower()]
-        return jsonify(results[:5])
+        with span('index'):
+            results = books_data.get_many(autocomplete_index.suggest(query, limit))
+        return jsonify(results)
     return jsonify([])
 
+@app.route('/api/books')
+def api_books():
+    """API каталога: ?search=&theme=&sort=title|author|year&limit=&cursor= (или page=)"""
+    theme = request.args.get('theme', '')
+    search = request.args.get('search', '')
+    sort, page, limit, cursor = get_page_args()
+    
+    book_ids, _ = find_book_ids(search, theme, sort)
+    rank = sort_index.rank(sort) if not (search or theme) else None
+    pagination = paginate(book_ids, page=page, limit=limit, cursor=cursor, rank=rank)
+    return jsonify({
+        'books': books_data.get_many(pagination.ids),
+        'total': pagination.total,
+        'page': pagination.page,
+        'limit': pagination.limit,
+        'next_cursor': pagination.next_cursor
+    })
+
+def collect_cache_metrics():
+    """Счетчики пула хеширования паролей и кэшей страниц и фрагментов для /metrics"""
+    hashing = password_hasher.stats()
+    fragment_cache = app.jinja_env.fragment_cache
+    return [
+        ('password_hash_queue', 'gauge', 'Задачи хеширования паролей в очереди',
+         [({}, hashing['queued'])]),
+        ('password_hash_active', 'gauge', 'Задачи хеширования паролей в работе',
+         [({}, hashing['active'])]),
+        ('password_hash_completed_total', 'counter', 'Выполненные задачи хеширования паролей',
+         [({}, hashing['completed'])]),
+        ('password_hash_rejected_total', 'counter', 'Задачи хеширования, отклоненные из-за полной очереди',
+         [({}, hashing['rejected'])]),
+        ('password_hash_timed_out_total', 'counter', 'Задачи хеширования, не дождавшиеся результата',
+         [({}, hashing['timed_out'])]),
+        ('password_hash_wait_seconds_total', 'counter', 'Суммарное ожидание задач хеширования в очереди',
+         [({}, hashing['wait_seconds_total'])]),
+        ('cache_hits_total', 'counter', 'Попадания в кэши',
+         [({'cache': 'response'}, response_cache.hits), ({'cache': 'fragment'}, fragment_cache.hits)]),
+        ('cache_misses_total', 'counter', 'Промахи кэшей',
+         [({'cache': 'response'}, response_cache.misses), ({'cache': 'fragment'}, fragment_cache.misses)]),
+        ('cache_entries', 'gauge', 'Записей в кэшах',
+         [({'cache': 'response'}, len(response_cache)), ({'cache': 'fragment'}, len(fragment_cache))]),
+    ]
+
+request_metrics.add_collector(collect_cache_metrics)
+
+@app.route('/metrics')
+def metrics():
+    """Метрики в текстовом формате Prometheus"""
+    return app.response_class(request_metrics.render(),
+                              content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def positive_arg(name: str, default: float):
+    """Положительное конечное число из параметра запроса, default без параметра, None для неверного"""
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    if not math.isfinite(number) or number <= 0:
+        return None
+    return number
+
+@app.route('/admin/profile')
+def admin_profile():
+    """Профилирует процесс ?seconds=N секунд и отдает стеки по маршрутам (только для администратора).
+
+    ?interval= задает интервал выборки в секундах, ?threads=all добавляет
+    потоки вне запросов. Ответ - свернутые стеки для flamegraph.pl или
+    speedscope. Пока идет профилирование, этот поток сервера занят.
+    """
+    if session.get('user', {}).get('username') != 'admin':
+        return app.response_class('Доступно только администратору\n', status=403,
+                                  content_type='text/plain; charset=utf-8')
+    seconds = positive_arg('seconds', 10.0)
+    interval = positive_arg('interval', app.config['PROFILER_INTERVAL'])
+    if seconds is None or interval is None:
+        return app.response_class('seconds и interval должны быть положительными числами\n', status=400,
+                                  content_type='text/plain; charset=utf-8')
+    seconds = max(0.1, min(seconds, app.config['PROFILER_MAX_SECONDS']))
+    interval = max(MIN_INTERVAL, min(interval, seconds))
+    try:
+        samples = sampling_profiler.profile(seconds, interval=interval,
+                                            all_threads=request.args.get('threads') == 'all')
+    except ProfilerBusy:
+        return app.response_class('Профилирование уже идет\n', status=409,
+                                  content_type='text/plain; charset=utf-8')
+    return app.response_class(collapse(samples), content_type='text/plain; charset=utf-8')
+
 @app.route('/delete_account', methods=['POST'])
 def delete_account():
     """Удаляет аккаунт пользователя"""
@@ -680,10 +983,9 @@ def delete_account():
         flash('Пожалуйста, войдите в систему', 'error')
         return redirect(url_for('login'))
     
-    current_users = load_data(USERS_FILE) or {}
-    username = session['user']['username']
+    current_user = get_current_user()
     
-    if username not in current_users:
+    if not current_user:
         flash('Ошибка: пользователь не найден', 'error')
         return redirect(url_for('profile'))
     
@@ -695,15 +997,149 @@ def delete_account():
         return redirect(url_for('profile'))
     
     # Удаляем пользователя
-    del current_users[username]
-    save_data(USERS_FILE, current_users)
+    users.delete(current_user.username)
     
     # Выходим из системы
     session.pop('user', None)
+    app.session_interface.regenerate(session)
     
     flash('Ваш аккаунт был успешно удален. Все данные удалены.', 'success')
     return redirect(url_for('index'))
 
+@app.cli.command('migrate-to-sqlite')
+@click.option('--database', default=None, help='Файл базы SQLite (по умолчанию SQLITE_DATABASE)')
+def migrate_to_sqlite_command(database):
+    """Переносит users.json и books.json в базу SQLite"""
+    database = SQLiteDatabase(database or app.config['SQLITE_DATABASE'])
+    json_users = UserRepository(USERS_FILE).export()
+    json_books = load_data(BOOKS_FILE) or []
+    migrate_from_json(database, json_users, json_books)
+    click.echo(f"Перенесено пользователей: {len(json_users)}, книг: {len(json_books)} в {database.path}")
+    click.echo("Чтобы использовать базу, установите STORAGE_BACKEND = 'sqlite'")
+
+@app.cli.command('generate-data')
+@click.option('--books', default=1000, show_default=True, help='Число книг')
+@click.option('--users', default=1000, show_default=True, help='Число учеников (admin добавляется отдельно)')
+@click.option('--seed', default=509, show_default=True, help='Одинаковый seed дает одинаковые данные')
+@click.option('--backend', type=click.Choice(['json', 'sqlite']), default=None,
+              help='Куда писать (по умолчанию STORAGE_BACKEND)')
+@click.option('--directory', default='.', show_default=True,
+              help='Каталог для users.json и books.json или базы SQLITE_DATABASE')
+@click.option('--password', default='password', show_default=True, help='Пароль всех учеников')
+@click.option('--yes', is_flag=True, help='Не спрашивать перед заменой данных')
+def generate_data_command(books, users, seed, backend, directory, password, yes):
+    """Заменяет каталог и пользователей синтетическими данными для замеров"""
+    backend = backend or app.config['STORAGE_BACKEND']
+    if backend == 'sqlite':
+        targets = [os.path.join(directory, app.config['SQLITE_DATABASE'])]
+    else:
+        targets = [os.path.join(directory, BOOKS_FILE), os.path.join(directory, USERS_FILE)]
+    existing = [path for path in targets if os.path.exists(path)]
+    if existing and not yes:
+        click.confirm(f"Данные в {', '.join(existing)} будут заменены. Продолжить?", abort=True)
+    
+    os.makedirs(directory, exist_ok=True)
+    started = time.perf_counter()
+    book_list, user_data = generate_dataset(books, users, seed=seed, password=password)
+    if backend == 'sqlite':
+        written = write_sqlite(book_list, user_data, targets[0])
+    else:
+        written = write_json(book_list, user_data, *targets)
+    if not written:
+        raise click.ClickException(f"Не удалось записать данные в {', '.join(targets)}")
+    click.echo(f"Создано книг: {len(book_list)}, пользователей: {len(user_data)} "
+               f"в {', '.join(targets)} за {time.perf_counter() - started:.1f} с")
+    click.echo(f"Пароль учеников: {password}, администратора: admin123")
+
+# Запросы, которые прогреваются перед приемом трафика
+WARM_UP_URLS = ['/', '/catalog', '/about', '/api/search?q=а', '/api/books']
+
+def warm_up_application():
+    """Готовит процесс к первым запросам и возвращает [(этап, секунды)].
+
+    Загружает все шаблоны, заполняет ленивые части индексов, компилирует
+    таблицу маршрутов и прогоняет несколько запросов гостя через
+    тестовый клиент, чтобы заполнить кэши страниц и фрагментов.
+    """
+    def load_templates():
+        for name in app.jinja_env.list_templates():
+            app.jinja_env.get_template(name)
+    
+    def build_indexes():
+        len(users)
+        for sort in ['', *SORT_KEYS]:
+            sort_index.rank(sort)
+        theme_index.themes()
+        search_index.search('а', limit=1)
+    
+    def compile_routes():
+        app.url_map.update()
+        with app.test_request_context():
+            for rule in app.url_map.iter_rules():
+                if not rule.arguments:
+                    url_for(rule.endpoint)
+    
+    def synthetic_requests():
+        client = app.test_client()
+        urls = list(WARM_UP_URLS)
+        if len(books_data):
+            urls.append(f"/book/{books_data[0]['id']}")
+        for url in urls:
+            response = client.get(url)
+            response.close()
+            if response.status_code >= 500:
+                print(f"Прогрев: {url} вернул {response.status_code}")
+    
+    phases = [
+        ('шаблоны', load_templates),
+        ('индексы', build_indexes),
+        ('маршруты', compile_routes),
+        ('запросы', synthetic_requests),
+    ]
+    timings = []
+    for name, phase in phases:
+        started = time.perf_counter()
+        phase()
+        timings.append((name, time.perf_counter() - started))
+    return timings
+
+def print_timings(timings):
+    for name, seconds in timings:
+        print(f"  {name}: {seconds * 1000:.1f} мс")
+    print(f"  всего: {sum(seconds for _, seconds in timings) * 1000:.1f} мс")
+
+def create_app(warm_up=False):
+    """Фабрика для WSGI-сервера: app:create_app(warm_up=True) прогревает процесс до приема запросов"""
+    if warm_up:
+        print("Прогрев приложения...")
+        print_timings(warm_up_application())
+    return app
+
+@app.cli.command('warm-up')
+def warm_up_command():
+    """Прогревает шаблоны, индексы, маршруты и показывает время каждого этапа"""
+    print_timings(warm_up_application())
+
+@app.cli.command('profile')
+@click.option('--url', default='http://localhost:5000', show_default=True, help='Адрес работающего сервера')
+@click.option('--seconds', default=10.0, show_default=True, help='Длительность профилирования')
+@click.option('--interval', default=None, type=float, help='Интервал выборки в секундах')
+@click.option('--all-threads', is_flag=True, help='Учитывать потоки вне запросов')
+@click.option('--username', default='admin', show_default=True)
+@click.option('--password', prompt=True, hide_input=True)
+@click.option('--output', '-o', type=click.File('w', encoding='utf-8'), default='-',
+              help='Файл для свернутых стеков (по умолчанию stdout)')
+def profile_command(url, seconds, interval, all_threads, username, password, output):
+    """Снимает профиль с работающего сервера через /admin/profile"""
+    try:
+        stacks = fetch_profile(url, username, password, seconds, interval, all_threads)
+    except urllib.error.HTTPError as e:
+        raise click.ClickException(f"Сервер ответил {e.code}: {e.read().decode('utf-8', 'replace').strip()}")
+    except urllib.error.URLError as e:
+        raise click.ClickException(f"Не удалось подключиться к {url}: {e.reason}")
+    output.write(stacks)
+    click.echo(f"Стеков: {len(stacks.splitlines())}", err=True)
+
 if __name__ == '__main__':
     print("=" * 50)
     print("Библиотека школы 509 запущена!")
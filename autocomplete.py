@@ -0,0 +1,202 @@
+import heapq
+import itertools
+import threading
+
+from catalog_store import CatalogIndex
+from search_index import tokenize
+
+
+# Вес слова подсказки в зависимости от поля книги
+TITLE_WEIGHT = 2
+AUTHOR_WEIGHT = 1
+
+# Сколько подсказок хранится в каждом узле префиксного дерева
+MAX_SUGGESTIONS = 20
+
+# Для запросов из нескольких слов поддерево самого редкого слова
+# просматривается целиком, если в нем не больше стольких записей
+MAX_SUBTREE_SCAN = 256
+
+
+class _Node:
+    __slots__ = ('children', 'books', 'top', 'size')
+
+    def __init__(self):
+        self.children = {}
+        # book_id → вес для слов, которые заканчиваются в этом узле
+        self.books = {}
+        # Лучшие книги поддерева: [(-вес, порядок, book_id)]
+        self.top = []
+        # Число пар (книга, слово) в поддереве
+        self.size = 0
+
+
+class AutocompleteIndex(CatalogIndex):
+    """Префиксное дерево слов из названий и авторов для подсказок поиска.
+
+    В каждом узле заранее посчитаны лучшие MAX_SUGGESTIONS книг
+    поддерева, поэтому подсказки для одного слова - это проход по
+    буквам префикса и срез готового списка. Список узла выводится из
+    списков детей, так что после изменения книги пересчитываются только
+    узлы на путях ее слов.
+    """
+
+    def __init__(self, fallback=None):
+        self._lock = threading.RLock()
+        self._root = _Node()
+        self._book_tokens = {}
+        self._order = {}
+        self._sequence = itertools.count()
+        self._fallback = fallback
+
+    @staticmethod
+    def _book_weights(book: dict) -> dict:
+        weights = {}
+        for token in tokenize(book.get('author') or ''):
+            weights[token] = AUTHOR_WEIGHT
+        for token in tokenize(book.get('title') or ''):
+            weights[token] = TITLE_WEIGHT
+        return weights
+
+    def rebuild(self):
+        with self._lock:
+            self._root = _Node()
+            self._book_tokens = {}
+            self._order = {}
+            self._sequence = itertools.count()
+            # Сначала группируем книги по словам, чтобы пройти каждое
+            # слово по дереву один раз
+            token_books = {}
+            for book in self._store:
+                self._order[book['id']] = next(self._sequence)
+                weights = self._book_weights(book)
+                self._book_tokens[book['id']] = weights
+                for token, weight in weights.items():
+                    token_books.setdefault(token, {})[book['id']] = weight
+            for token, books in token_books.items():
+                self._path(token, create=True)[-1].books = books
+            self._recompute_subtree(self._root)
+
+    def _recompute_subtree(self, node: _Node):
+        node.size = len(node.books)
+        for child in node.children.values():
+            self._recompute_subtree(child)
+            node.size += child.size
+        self._recompute(node)
+
+    def _recompute(self, node: _Node):
+        best = {}
+        for book_id, weight in node.books.items():
+            best[book_id] = (-weight, self._order[book_id], book_id)
+        for child in node.children.values():
+            for entry in child.top:
+                current = best.get(entry[2])
+                if current is None or entry < current:
+                    best[entry[2]] = entry
+        node.top = heapq.nsmallest(MAX_SUGGESTIONS, best.values())
+
+    def _path(self, token: str, create: bool = False) -> list:
+        nodes = [self._root]
+        node = self._root
+        for char in token:
+            child = node.children.get(char)
+            if child is None:
+                if not create:
+                    return []
+                child = node.children[char] = _Node()
+            node = child
+            nodes.append(node)
+        return nodes
+
+    def add_book(self, book: dict):
+        """Добавляет книгу (повторный вызов обновляет ее слова)"""
+        with self._lock:
+            book_id = book['id']
+            weights = self._book_weights(book)
+            if self._book_tokens.get(book_id) == weights:
+                return
+            if book_id in self._book_tokens:
+                self.remove_book(book_id, keep_order=True)
+            self._order.setdefault(book_id, next(self._sequence))
+            self._book_tokens[book_id] = weights
+            entry_order = self._order[book_id]
+            for token, weight in weights.items():
+                entry = (-weight, entry_order, book_id)
+                for node in self._path(token, create=True):
+                    node.size += 1
+                    if len(node.top) < MAX_SUGGESTIONS or entry < node.top[-1]:
+                        self._recompute_with(node, entry)
+                node.books[book_id] = weight
+
+    def _recompute_with(self, node: _Node, entry: tuple):
+        top = [e for e in node.top if e[2] != entry[2] or e < entry]
+        if not any(e[2] == entry[2] for e in top):
+            top.append(entry)
+        node.top = heapq.nsmallest(MAX_SUGGESTIONS, top)
+
+    def remove_book(self, book_id: int, keep_order: bool = False):
+        with self._lock:
+            weights = self._book_tokens.pop(book_id, None)
+            if weights is None:
+                return
+            # Сначала убираем книгу со всех ее слов: одно слово может быть
+            # префиксом другого, и узел на пути длинного слова иначе
+            # пересчитался бы с книгой, которая еще лежит в его books
+            paths = []
+            for token in weights:
+                path = self._path(token)
+                path[-1].books.pop(book_id, None)
+                for node in path:
+                    node.size -= 1
+                paths.append((token, path))
+            # Пересчитываем снизу вверх и убираем опустевшие узлы
+            for token, path in paths:
+                for depth in range(len(path) - 1, -1, -1):
+                    node = path[depth]
+                    if depth and not node.size:
+                        path[depth - 1].children.pop(token[depth - 1], None)
+                    elif any(e[2] == book_id for e in node.top):
+                        self._recompute(node)
+            if not keep_order:
+                del self._order[book_id]
+
+    def _subtree_books(self, node: _Node, found: set):
+        found.update(node.books)
+        for child in node.children.values():
+            self._subtree_books(child, found)
+
+    def suggest(self, query: str, limit: int = 5) -> list:
+        """Возвращает id книг для подсказок: каждое слово запроса - префикс слова книги"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+        limit = max(1, min(limit, MAX_SUGGESTIONS))
+        with self._lock:
+            nodes = []
+            for token in tokens:
+                path = self._path(token)
+                if not path:
+                    return []
+                nodes.append(path[-1])
+            if len(tokens) == 1:
+                return [book_id for _, _, book_id in nodes[0].top[:limit]]
+            selective = min(nodes, key=lambda node: node.size)
+            if selective.size > MAX_SUBTREE_SCAN:
+                if self._fallback is not None:
+                    return self._fallback(query, limit=limit)
+                return []
+            candidates = set()
+            self._subtree_books(selective, candidates)
+            ranked = []
+            for book_id in candidates:
+                book_tokens = self._book_tokens[book_id]
+                score = 0
+                for token in tokens:
+                    best = max((weight for word, weight in book_tokens.items()
+                                if word.startswith(token)), default=0)
+                    if not best:
+                        break
+                    score += best
+                else:
+                    ranked.append((-score, self._order[book_id], book_id))
+            return [book_id for _, _, book_id in heapq.nsmallest(limit, ranked)]
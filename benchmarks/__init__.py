@@ -0,0 +1 @@
+"""Замеры производительности библиотеки. Запуск: python -m benchmarks.<имя>"""
@@ -0,0 +1,294 @@
+"""Нагрузочные сценарии через тестовый клиент Flask на синтетических данных.
+
+Запуск: python -m benchmarks.load_test [--sizes 1k,10k,100k] [--scenarios ...]
+        [--requests N] [--backend json|sqlite] [--set КЛЮЧ=значение]
+        [--output benchmark-results.json]
+
+app.py загружает данные при импорте из текущего каталога, поэтому
+каждый размер данных замеряется в отдельном процессе во временном
+каталоге с books.json и users.json (или library.db). Сценарии идут
+последовательно в одном потоке. Время ответа меряется без tracemalloc,
+память - отдельным коротким проходом под tracemalloc. Результаты всех
+размеров пишутся одним JSON-файлом, который удобно сравнивать между
+версиями.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from data_generator import generate_dataset, write_json, write_sqlite
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Пароль всех синтетических учеников
+PASSWORD = 'benchmark'
+
+SORTS = ['', 'title', 'author', 'year']
+
+
+def catalog_browsing(client, rng, data):
+    """Гость листает каталог: страницы, темы и сортировки"""
+    pages = max(1, len(data['books']) // 24)
+    themes = sorted({theme for book in data['books'] for theme in book['theme']})
+
+    def step():
+        params = {'page': rng.randint(1, min(pages, 50)), 'sort': rng.choice(SORTS)}
+        if rng.random() < 0.3:
+            params['theme'] = rng.choice(themes)
+        return client.get('/catalog', query_string=params)
+    return step
+
+
+def search_as_you_type(client, rng, data):
+    """Подсказки /api/search на каждую букву названия"""
+    def queries():
+        while True:
+            title = rng.choice(data['books'])['title']
+            for length in range(1, min(len(title), 10) + 1):
+                yield title[:length]
+
+    query = queries()
+
+    def step():
+        return client.get('/api/search', query_string={'q': next(query)})
+    return step
+
+
+def login_storm(client, rng, data):
+    """Вход случайных пользователей (хеш пароля считается на каждый запрос)"""
+    def step():
+        username = rng.choice(data['usernames'])
+        return client.post('/login', data={'username': username, 'password': PASSWORD})
+    return step
+
+
+def _login(client, username):
+    response = client.post('/login', data={'username': username, 'password': PASSWORD})
+    response.close()
+
+
+def toggle_reading_churn(client, rng, data):
+    """Пользователь начинает и заканчивает читать случайные книги"""
+    _login(client, rng.choice(data['usernames']))
+
+    def step():
+        return client.get(f"/toggle_reading/{rng.choice(data['books'])['id']}")
+    return step
+
+
+def profile_views(client, rng, data):
+    """Личный кабинет пользователя с самой длинной историей чтения"""
+    username = max(data['usernames'], key=lambda name: len(data['users'][name]['reading_history']))
+    _login(client, username)
+
+    def step():
+        return client.get('/profile')
+    return step
+
+
+# Сценарий и доля от --requests: вход намеренно медленный (scrypt)
+SCENARIOS = {
+    'catalog': (catalog_browsing, 1.0),
+    'search': (search_as_you_type, 1.0),
+    'login': (login_storm, 0.1),
+    'toggle_reading': (toggle_reading_churn, 1.0),
+    'profile': (profile_views, 1.0),
+}
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    if text.endswith('k'):
+        return int(float(text[:-1]) * 1000)
+    return int(text)
+
+
+def percentile(values: list, share: float) -> float:
+    """Процентиль отсортированного списка (ближайший ранг)"""
+    rank = math.ceil(share * len(values))
+    return values[max(0, min(len(values), rank) - 1)]
+
+
+def run_request(step) -> int:
+    response = step()
+    response.get_data()
+    response.close()
+    return response.status_code
+
+
+def measure_latency(step, count: int) -> dict:
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(count):
+        request_started = time.perf_counter()
+        if run_request(step) >= 500:
+            errors += 1
+        latencies.append(time.perf_counter() - request_started)
+    seconds = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'requests': count,
+        'errors': errors,
+        'seconds': round(seconds, 4),
+        'throughput_rps': round(count / seconds, 1),
+        'latency_ms': {
+            'mean': round(sum(latencies) / count * 1000, 3),
+            'p50': round(percentile(latencies, 0.50) * 1000, 3),
+            'p95': round(percentile(latencies, 0.95) * 1000, 3),
+            'p99': round(percentile(latencies, 0.99) * 1000, 3),
+            'max': round(latencies[-1] * 1000, 3),
+        },
+    }
+
+
+def measure_allocations(step, count: int) -> dict:
+    """Средний пик выделенной памяти на запрос и память, оставшаяся после прохода"""
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    peaks = 0
+    for _ in range(count):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        run_request(step)
+        peaks += tracemalloc.get_traced_memory()[1] - before
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return {
+        'requests': count,
+        'peak_kib_per_request': round(peaks / count / 1024, 2),
+        'retained_kib_per_request': round(retained / count / 1024, 2),
+    }
+
+
+def run_size(size: int, args) -> dict:
+    """Замеры одного размера данных; вызывается в отдельном процессе"""
+    books, users = generate_dataset(size, size, seed=args.seed, password=PASSWORD)
+    directory = tempfile.mkdtemp(prefix=f'library-bench-{size}-')
+    if args.backend == 'sqlite':
+        written = write_sqlite(books, users, os.path.join(directory, 'library.db'))
+        os.environ['LIBRARY_STORAGE_BACKEND'] = 'sqlite'
+    else:
+        written = write_json(books, users, os.path.join(directory, 'books.json'),
+                             os.path.join(directory, 'users.json'))
+    if not written:
+        # Иначе замерялся бы пустой каталог, и отчет этого бы не показал
+        shutil.rmtree(directory, ignore_errors=True)
+        sys.exit(f"Не удалось записать данные размера {size} в {directory}")
+    # Журнал медленных запросов засорил бы вывод замеров
+    os.environ.setdefault('LIBRARY_SLOW_REQUEST_THRESHOLD', 'null')
+    for item in args.set:
+        key, _, value = item.partition('=')
+        os.environ[f'LIBRARY_{key}'] = value
+    os.chdir(directory)
+
+    started = time.perf_counter()
+    import app as library
+    startup_seconds = time.perf_counter() - started
+
+    # admin входит с другим паролем, сценарии используют только учеников
+    data = {'books': books, 'users': users,
+            'usernames': [username for username in users if username != 'admin']}
+    results = []
+    for name in args.scenarios:
+        scenario, share = SCENARIOS[name]
+        count = max(1, int(args.requests * share))
+        rng = random.Random(f'{args.seed}-{name}')
+        step = scenario(library.app.test_client(), rng, data)
+        for _ in range(min(count, args.warmup)):
+            run_request(step)
+        result = {'scenario': name, **measure_latency(step, count)}
+        result['memory'] = measure_allocations(step, max(1, min(count, args.alloc_requests)))
+        results.append(result)
+        latency = result['latency_ms']
+        print(f"{size:>8} {name:<16}{result['throughput_rps']:>10.1f} зап/с"
+              f"{latency['p50']:>10.2f}{latency['p95']:>10.2f}{latency['p99']:>10.2f} мс"
+              f"{result['memory']['peak_kib_per_request']:>10.1f} КиБ", file=sys.stderr)
+    library.password_hasher.shutdown()
+    os.chdir(ROOT)
+    shutil.rmtree(directory, ignore_errors=True)
+    return {
+        'size': size,
+        'books': len(books),
+        'users': len(users),
+        'startup_seconds': round(startup_seconds, 3),
+        'scenarios': results,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1k,10k,100k',
+                        help='размеры данных через запятую: число книг и пользователей')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"сценарии через запятую: {', '.join(SCENARIOS)}")
+    parser.add_argument('--requests', type=int, default=200, help='запросов на сценарий')
+    parser.add_argument('--warmup', type=int, default=10, help='запросов на прогрев перед замером')
+    parser.add_argument('--alloc-requests', type=int, default=20,
+                        help='запросов в проходе с tracemalloc')
+    parser.add_argument('--backend', choices=['json', 'sqlite'], default='json')
+    parser.add_argument('--set', action='append', default=[], metavar='КЛЮЧ=значение',
+                        help='настройка приложения, например USERS_JOURNAL=true')
+    parser.add_argument('--seed', type=int, default=509)
+    parser.add_argument('--output', default='benchmark-results.json', help='файл с результатами')
+    parser.add_argument('--size-worker', type=parse_size, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"неизвестные сценарии: {', '.join(unknown)}")
+
+    if args.size_worker:
+        # Сообщения приложения идут в stderr, в stdout - только JSON результата
+        stdout, sys.stdout = sys.stdout, sys.stderr
+        result = run_size(args.size_worker, args)
+        json.dump(result, stdout, ensure_ascii=False)
+        return
+
+    output = os.path.abspath(args.output)
+    results = []
+    for size in [parse_size(text) for text in args.sizes.split(',')]:
+        command = [sys.executable, '-m', 'benchmarks.load_test', *sys.argv[1:],
+                   '--size-worker', str(size)]
+        completed = subprocess.run(command, cwd=ROOT, stdout=subprocess.PIPE, encoding='utf-8')
+        if completed.returncode != 0:
+            sys.exit(f"Замер размера {size} завершился с ошибкой {completed.returncode}")
+        results.append(json.loads(completed.stdout))
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'backend': args.backend,
+        'settings': args.set,
+        'seed': args.seed,
+        'requests': args.requests,
+        'results': results,
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Результаты записаны в {output}")
+
+
+if __name__ == '__main__':
+    main()
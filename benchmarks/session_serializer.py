@@ -0,0 +1,57 @@
+"""Сравнение быстрого и обычного пути TaggedJSONSerializer на данных сессии.
+
+Запуск: python -m benchmarks.session_serializer [--number N]
+
+Каждый запрос, который читает и меняет сессию, делает один loads() и
+один dumps(), поэтому экономия на запрос - сумма разниц этих операций.
+"""
+import argparse
+import timeit
+
+from flask.sessions import session_json_serializer
+from flask.json.tag import TaggedJSONSerializer
+
+
+# Типичные сессии приложения: вошедший пользователь и страница с flash
+# (flash хранится кортежем)
+PAYLOADS = {
+    'пользователь': {
+        '_permanent': True,
+        'user': {'username': 'ivanov', 'full_name': 'Иван Иванов', 'grade': '9'},
+    },
+    'пользователь + flash': {
+        '_permanent': True,
+        'user': {'username': 'ivanov', 'full_name': 'Иван Иванов', 'grade': '9'},
+        '_flashes': [('success', 'Книга добавлена в избранное!')],
+    },
+}
+
+
+def measure(serializer, payload, number):
+    """Возвращает (мкс на dumps, мкс на loads)"""
+    data = serializer.dumps(payload)
+    dumps = min(timeit.repeat(lambda: serializer.dumps(payload), number=number, repeat=5))
+    loads = min(timeit.repeat(lambda: serializer.loads(data), number=number, repeat=5))
+    return dumps / number * 1e6, loads / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=20000, help='повторов в одном замере')
+    args = parser.parse_args()
+
+    slow = TaggedJSONSerializer(fast_path=False)
+    fast = session_json_serializer
+
+    print(f"{'сессия':<22}{'путь':<10}{'dumps, мкс':>12}{'loads, мкс':>12}{'всего, мкс':>12}")
+    for name, payload in PAYLOADS.items():
+        results = {}
+        for label, serializer in (('обычный', slow), ('быстрый', fast)):
+            dumps, loads = results[label] = measure(serializer, payload, args.number)
+            print(f"{name:<22}{label:<10}{dumps:>12.2f}{loads:>12.2f}{dumps + loads:>12.2f}")
+        saving = sum(results['обычный']) - sum(results['быстрый'])
+        print(f"{'':<22}{'экономия на запрос':<34}{saving:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+import threading
+from bisect import bisect_left
+
+from storage import load_data, save_data
+from versions import VersionCounter
+
+
+class JsonBookStorage:
+    """Хранение каталога в books.json: любое изменение перезаписывает файл"""
+
+    def __init__(self, filename: str):
+        self.filename = filename
+
+    def load(self):
+        return load_data(self.filename)
+
+    def save_all(self, books: list) -> bool:
+        return save_data(self.filename, books)
+
+    def save_book(self, book: dict, books: list) -> bool:
+        return save_data(self.filename, books)
+
+    def delete_book(self, book_id: int, books: list) -> bool:
+        return save_data(self.filename, books)
+
+
+class CatalogStore:
+    """Книги каталога с индексами id → книга и id → позиция в списке.
+
+    Порядок книг совпадает с books.json. Позиция книги не меняется, пока
+    каталог не заменен целиком: удаление оставляет в нумерации пропуск,
+    а не сдвигает все следующие книги. Все изменения каталога идут
+    через методы хранилища, поэтому индексы всегда согласованы со
+    списком и хранилищем (JsonBookStorage или SQLiteBookStorage).
+
+    Подписчики (поисковые индексы и т.п.) получают каждое изменение
+    вызовом callback(event, book), где event - 'add', 'update',
+    'remove' или 'reset' (для reset book равен None). Каждое изменение
+    увеличивает версию каталога и версию затронутой книги (version()).
+    """
+
+    def __init__(self, storage, books: list):
+        self.storage = storage
+        self._lock = threading.RLock()
+        self.books = books
+        self._by_id = {}
+        self._positions = {}
+        self._next_position = 0
+        self._listeners = []
+        self._versions = VersionCounter()
+        self._reindex()
+
+    def _reindex(self):
+        self._by_id = {book['id']: book for book in self.books}
+        self._positions = {book['id']: i for i, book in enumerate(self.books)}
+        self._next_position = len(self.books)
+
+    def subscribe(self, callback):
+        """Подписывает callback(event, book) на изменения каталога"""
+        self._listeners.append(callback)
+
+    def _notify(self, event: str, book):
+        if book is None:
+            self._versions.reset()
+        else:
+            self._versions.bump()
+            self._versions.bump(book['id'])
+        for callback in self._listeners:
+            callback(event, book)
+
+    def version(self, book_id=None) -> tuple:
+        """Возвращает (номер версии, время изменения) каталога или книги book_id"""
+        return self._versions.get(book_id)
+
+    def __len__(self) -> int:
+        return len(self.books)
+
+    def __iter__(self):
+        return iter(self.books)
+
+    def __getitem__(self, index):
+        return self.books[index]
+
+    def __contains__(self, book_id: int) -> bool:
+        return book_id in self._by_id
+
+    def get(self, book_id: int):
+        """Возвращает книгу по id или None"""
+        return self._by_id.get(book_id)
+
+    def position(self, book_id: int):
+        """Возвращает позицию книги в каталоге или None.
+
+        Позиции растут в порядке каталога, но после удаления книг идут
+        с пропусками, поэтому годятся для сравнения, а не как индекс списка.
+        """
+        return self._positions.get(book_id)
+
+    def get_many(self, book_ids) -> list:
+        """Возвращает книги по списку id в том же порядке, пропуская несуществующие"""
+        by_id = self._by_id
+        return [by_id[book_id] for book_id in book_ids if book_id in by_id]
+
+    def add(self, book: dict) -> bool:
+        """Добавляет книгу в конец каталога"""
+        with self._lock:
+            if book['id'] in self._by_id:
+                raise ValueError(f"Книга с id {book['id']} уже есть в каталоге")
+            self._positions[book['id']] = self._next_position
+            self._next_position += 1
+            self._by_id[book['id']] = book
+            self.books.append(book)
+            self._notify('add', book)
+            return self.storage.save_book(book, self.books)
+
+    def update(self, book_id: int, **fields) -> bool:
+        """Изменяет поля книги"""
+        with self._lock:
+            book = self._by_id.get(book_id)
+            if book is None:
+                return False
+            if 'id' in fields and fields['id'] != book_id:
+                raise ValueError("id книги нельзя изменить")
+            book.update(fields)
+            self._notify('update', book)
+            return self.storage.save_book(book, self.books)
+
+    def remove(self, book_id: int) -> bool:
+        """Удаляет книгу из каталога"""
+        with self._lock:
+            position = self._positions.get(book_id)
+            if position is None:
+                return False
+            positions = self._positions
+            index = bisect_left(self.books, position, key=lambda book: positions[book['id']])
+            book = self.books.pop(index)
+            del self._positions[book_id]
+            del self._by_id[book_id]
+            self._notify('remove', book)
+            return self.storage.delete_book(book_id, self.books)
+
+    def replace_all(self, books: list) -> bool:
+        """Заменяет весь каталог"""
+        with self._lock:
+            self.books = books
+            self._reindex()
+            self._notify('reset', None)
+            return self.storage.save_all(books)
+
+    def toggle_available(self, book_id: int):
+        """Переключает доступность книги, возвращает книгу или None"""
+        with self._lock:
+            book = self._by_id.get(book_id)
+            if book is None:
+                return None
+            self.update(book_id, available=not book.get('available', True))
+            return book
+
+
+class CatalogIndex:
+    """Основа индексов, которые строятся по CatalogStore и обновляются по его событиям.
+
+    Подкласс реализует rebuild() - построение по всему self._store,
+    add_book(book) - добавление книги, повторный вызов для которой
+    обновляет ее, и remove_book(book_id).
+    """
+
+    _store = None
+
+    def attach(self, store):
+        """Строит индекс по каталогу и подписывается на его изменения"""
+        self._store = store
+        self.rebuild()
+        store.subscribe(self._on_catalog_change)
+
+    def _on_catalog_change(self, event: str, book):
+        if event == 'reset':
+            self.rebuild()
+        elif event == 'remove':
+            self.remove_book(book['id'])
+        else:
+            self.add_book(book)
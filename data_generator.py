@@ -0,0 +1,304 @@
+import hashlib
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+from journal import Journal
+from sqlite_storage import SQLiteDatabase, migrate_from_json
+from storage import save_data
+from user_repository import default_notifications
+
+
+# Дата, от которой отсчитываются даты регистрации и чтения: с
+# фиксированной датой один seed всегда дает одни и те же файлы
+REFERENCE_DATE = datetime(2026, 9, 1, 12, 0, 0)
+
+THEMES = [
+    'Смысл жизни', 'Война', 'Любовь', 'Свобода', 'Судьба', 'Дружба',
+    'Добро и зло', 'Мечта и реальность', 'Конфликт поколений',
+    'Маленький человек', 'Преступление', 'Вера', 'Надежда', 'Бескорыстие',
+    'Невежество', 'Лень', 'Родина', 'Природа', 'Честь', 'Совесть',
+    'Одиночество', 'Память', 'Взросление', 'Семья',
+]
+
+# Существительное: (именительный падеж, род, родительный падеж)
+NOUNS = [
+    ('сад', 'm', 'сада'), ('дом', 'm', 'дома'), ('берег', 'm', 'берега'),
+    ('путь', 'm', 'пути'), ('ветер', 'm', 'ветра'), ('город', 'm', 'города'),
+    ('капитан', 'm', 'капитана'), ('учитель', 'm', 'учителя'), ('сон', 'm', 'сна'),
+    ('колокол', 'm', 'колокола'), ('мост', 'm', 'моста'), ('лес', 'm', 'леса'),
+    ('дочь', 'f', 'дочери'), ('степь', 'f', 'степи'), ('река', 'f', 'реки'),
+    ('дорога', 'f', 'дороги'), ('весна', 'f', 'весны'), ('звезда', 'f', 'звезды'),
+    ('усадьба', 'f', 'усадьбы'), ('метель', 'f', 'метели'), ('песня', 'f', 'песни'),
+    ('память', 'f', 'памяти'), ('деревня', 'f', 'деревни'), ('тишина', 'f', 'тишины'),
+    ('поле', 'n', 'поля'), ('море', 'n', 'моря'), ('озеро', 'n', 'озера'),
+    ('письмо', 'n', 'письма'), ('лето', 'n', 'лета'), ('сердце', 'n', 'сердца'),
+    ('утро', 'n', 'утра'), ('окно', 'n', 'окна'), ('детство', 'n', 'детства'),
+]
+
+# Прилагательное в мужском, женском и среднем роде
+ADJECTIVES = [
+    ('Тихий', 'Тихая', 'Тихое'), ('Белый', 'Белая', 'Белое'),
+    ('Последний', 'Последняя', 'Последнее'), ('Старый', 'Старая', 'Старое'),
+    ('Далекий', 'Далекая', 'Далекое'), ('Зимний', 'Зимняя', 'Зимнее'),
+    ('Вишневый', 'Вишневая', 'Вишневое'), ('Горький', 'Горькая', 'Горькое'),
+    ('Золотой', 'Золотая', 'Золотое'), ('Синий', 'Синяя', 'Синее'),
+    ('Чужой', 'Чужая', 'Чужое'), ('Северный', 'Северная', 'Северное'),
+    ('Утренний', 'Утренняя', 'Утреннее'), ('Живой', 'Живая', 'Живое'),
+    ('Забытый', 'Забытая', 'Забытое'), ('Дикий', 'Дикая', 'Дикое'),
+]
+
+GENDER_INDEX = {'m': 0, 'f': 1, 'n': 2}
+
+GENRES = ['Роман', 'Повесть', 'Рассказ', 'Поэма', 'Пьеса', 'Сборник рассказов']
+
+PLOTS = [
+    'о взрослении героя в провинциальном городе',
+    'о семье, которую разделила война',
+    'о первой любви и ее испытаниях',
+    'о выборе между долгом и чувством',
+    'о человеке, потерявшем веру и нашедшем ее снова',
+    'о дружбе, пережившей годы разлуки',
+    'о столкновении мечты с действительностью',
+    'о споре отцов и детей',
+    'о маленьком человеке в большом городе',
+    'о преступлении и наказании совестью',
+    'о жизни русской деревни',
+    'о возвращении домой после долгих странствий',
+]
+
+DETAILS = [
+    'Автор показывает, как одно решение меняет судьбы нескольких поколений.',
+    'Простая история становится размышлением о смысле жизни.',
+    'Герои проходят путь от наивных надежд к зрелому пониманию себя.',
+    'В центре повествования - нравственный выбор, от которого нельзя уклониться.',
+    'Картины природы подчеркивают душевное состояние героев.',
+    'Книга входит в школьную программу и часто встречается в сочинениях.',
+    'Лирические отступления делают текст близким каждому читателю.',
+    'Финал оставляет читателю простор для собственных выводов.',
+]
+
+FIRST_NAMES = [
+    ('Александр', 'm'), ('Дмитрий', 'm'), ('Иван', 'm'), ('Максим', 'm'),
+    ('Михаил', 'm'), ('Артем', 'm'), ('Никита', 'm'), ('Егор', 'm'),
+    ('Кирилл', 'm'), ('Андрей', 'm'), ('Илья', 'm'), ('Павел', 'm'),
+    ('Анна', 'f'), ('Мария', 'f'), ('Елена', 'f'), ('Дарья', 'f'),
+    ('Полина', 'f'), ('Ольга', 'f'), ('Софья', 'f'), ('Виктория', 'f'),
+    ('Екатерина', 'f'), ('Алиса', 'f'), ('Ксения', 'f'), ('Вера', 'f'),
+]
+
+PATRONYMIC_INITIALS = 'АВГДЕИКМНПСФ'
+
+# Фамилии в мужской форме; женская форма образуется в surname()
+SURNAMES = [
+    'Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Соколов', 'Лебедев', 'Козлов',
+    'Новиков', 'Морозов', 'Волков', 'Соловьев', 'Васильев', 'Зайцев', 'Павлов',
+    'Семенов', 'Голубев', 'Виноградов', 'Богданов', 'Воробьев', 'Федоров',
+    'Михайлов', 'Беляев', 'Тарасов', 'Белов', 'Комаров', 'Орлов', 'Киселев',
+    'Макаров', 'Андреев', 'Ковалев', 'Ильин', 'Гусев', 'Титов', 'Кузьмин',
+    'Кудрявцев', 'Баранов', 'Куликов', 'Алексеев', 'Степанов', 'Яковлев',
+    'Сорокин', 'Никитин', 'Захаров', 'Зуев', 'Калинин', 'Островский',
+    'Введенский', 'Преображенский', 'Толстой', 'Луговской',
+]
+
+TRANSLIT = dict(zip(
+    'абвгдеёжзийклмнопрстуфхцчшщъыьэюя',
+    ['a', 'b', 'v', 'g', 'd', 'e', 'e', 'zh', 'z', 'i', 'y', 'k', 'l', 'm', 'n',
+     'o', 'p', 'r', 's', 't', 'u', 'f', 'kh', 'ts', 'ch', 'sh', 'shch', '', 'y',
+     '', 'e', 'yu', 'ya']))
+
+
+def transliterate(text: str) -> str:
+    """Латиница для имен файлов и логинов: 'Тихий сад' → 'tikhiy_sad'"""
+    result = []
+    for char in text.lower():
+        if char in TRANSLIT:
+            result.append(TRANSLIT[char])
+        elif char.isascii() and char.isalnum():
+            result.append(char)
+        elif result and result[-1] != '_':
+            result.append('_')
+    return ''.join(result).strip('_')
+
+
+def surname(base: str, gender: str) -> str:
+    """Фамилия в роде gender"""
+    if gender == 'm':
+        return base
+    if base.endswith(('ский', 'цкий')):
+        return base[:-2] + 'ая'
+    if base.endswith('ой'):
+        return base[:-2] + 'ая'
+    return base + 'а'
+
+
+def _timestamp(moment: datetime) -> str:
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def password_hash(password: str, rng: random.Random) -> str:
+    """Хеш в формате werkzeug 'scrypt:32768:8:1$соль$хеш' с солью из rng.
+
+    generate_password_hash берет соль из системного генератора, и файлы
+    с одним seed отличались бы хешами.
+    """
+    salt = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789')
+                   for _ in range(16))
+    n, r, p = 2 ** 15, 8, 1
+    digest = hashlib.scrypt(password.encode(), salt=salt.encode(), n=n, r=r, p=p,
+                            maxmem=132 * n * r * p)
+    return f'scrypt:{n}:{r}:{p}${salt}${digest.hex()}'
+
+
+def generate_title(rng: random.Random) -> str:
+    noun, gender, genitive = rng.choice(NOUNS)
+    pattern = rng.random()
+    if pattern < 0.5:
+        return f'{rng.choice(ADJECTIVES)[GENDER_INDEX[gender]]} {noun}'
+    other = rng.choice([item for item in NOUNS if item[0] != noun])
+    if pattern < 0.75:
+        return f'{noun.capitalize()} и {other[0]}'
+    if pattern < 0.9:
+        return f'{noun.capitalize()} {other[2]}'
+    return f'Без {genitive}' if rng.random() < 0.5 else f'{genitive.capitalize()} не будет'
+
+
+def generate_books(count: int, rng: random.Random) -> list:
+    """count книг в формате books.json с id от 1"""
+    authors = []
+    for _ in range(max(1, count // 8)):
+        first_name, gender = rng.choice(FIRST_NAMES)
+        authors.append(f'{first_name[0]}.{rng.choice(PATRONYMIC_INITIALS)}. '
+                       f'{surname(rng.choice(SURNAMES), gender)}')
+    books = []
+    titles = {}
+    for book_id in range(1, count + 1):
+        title = generate_title(rng)
+        # Одинаковые названия различаются номером тома
+        titles[title] = titles.get(title, 0) + 1
+        if titles[title] > 1:
+            title = f'{title} (том {titles[title]})'
+        books.append({
+            'id': book_id,
+            'title': title,
+            'author': rng.choice(authors),
+            'theme': rng.sample(THEMES, rng.randint(1, 3)),
+            'year': rng.randint(1780, 2020),
+            'description': f'{rng.choice(GENRES)} {rng.choice(PLOTS)}. {rng.choice(DETAILS)}',
+            'image': f'{transliterate(title)}.jpg',
+            'available': rng.random() < 0.8,
+        })
+    return books
+
+
+def _pick_books(rng: random.Random, book_ids: list, weights: list, count: int) -> list:
+    """До count разных книг; популярные (начало каталога) выпадают чаще"""
+    if not book_ids or count <= 0:
+        return []
+    picked = rng.choices(book_ids, cum_weights=weights, k=count)
+    return list(dict.fromkeys(picked))
+
+
+def generate_users(count: int, book_ids: list, rng: random.Random,
+                   password: str = 'password') -> dict:
+    """count учеников в формате users.json плюс admin с паролем admin123.
+
+    У всех учеников один пароль password и один хеш: scrypt для каждого
+    из сотни тысяч пользователей считался бы часами.
+    """
+    # Популярность книг убывает по закону Ципфа
+    weights = []
+    total = 0.0
+    for rank in range(len(book_ids)):
+        total += 1 / (rank + 1) ** 0.8
+        weights.append(total)
+    shared_hash = password_hash(password, rng)
+    users = {
+        'admin': {
+            'email': 'admin@school509.ru',
+            'password': password_hash('admin123', rng),
+            'full_name': 'Администратор Библиотеки',
+            'grade': '11',
+            'registered_at': _timestamp(REFERENCE_DATE - timedelta(days=1500)),
+            'reading_books': [],
+            'reading_dates': {},
+            'reading_history': [],
+            'history_dates': {},
+            'favorites': [],
+            'notifications': default_notifications(),
+        }
+    }
+    for index in range(1, count + 1):
+        first_name, gender = rng.choice(FIRST_NAMES)
+        last_name = surname(rng.choice(SURNAMES), gender)
+        username = f'{transliterate(first_name)}.{transliterate(last_name)}{index}'
+        registered = REFERENCE_DATE - timedelta(days=rng.randint(1, 1500),
+                                                seconds=rng.randint(0, 86399))
+        days_registered = (REFERENCE_DATE - registered).days
+
+        history = _pick_books(rng, book_ids, weights, rng.randint(0, min(60, days_registered // 7)))
+        reading = [book_id for book_id in _pick_books(rng, book_ids, weights, rng.randint(0, 3))
+                   if book_id not in history]
+        favorites = _pick_books(rng, book_ids, weights, rng.randint(0, 12))
+        # История упорядочена по дате окончания, как ее ведет finish_reading
+        finished = sorted(registered + timedelta(seconds=rng.randint(0, days_registered * 86400))
+                          for _ in history)
+        started = [REFERENCE_DATE - timedelta(seconds=rng.randint(0, 30 * 86400)) for _ in reading]
+
+        users[username] = {
+            'email': f'{username}@school509.ru',
+            'password': shared_hash,
+            'full_name': f'{first_name} {last_name}',
+            'grade': str(rng.randint(1, 11)),
+            'registered_at': _timestamp(registered),
+            'reading_books': reading,
+            'reading_dates': {str(book_id): _timestamp(when) for book_id, when in zip(reading, started)},
+            'reading_history': history,
+            'history_dates': {str(book_id): _timestamp(when) for book_id, when in zip(history, finished)},
+            'favorites': favorites,
+            'notifications': {
+                'new_books': rng.random() < 0.8,
+                'return_reminders': rng.random() < 0.9,
+                'recommendations': rng.random() < 0.3,
+            },
+        }
+    return users
+
+
+def generate_dataset(books: int, users: int, seed: int = 509, password: str = 'password') -> tuple:
+    """Возвращает (книги, пользователи); одинаковые аргументы дают одинаковые данные"""
+    rng = random.Random(seed)
+    book_list = generate_books(books, rng)
+    user_data = generate_users(users, [book['id'] for book in book_list], rng, password)
+    return book_list, user_data
+
+
+def write_json(books: list, users: dict, books_file: str, users_file: str) -> bool:
+    """Записывает books.json и users.json; журнал users.json.wal очищается.
+
+    Возвращает False, если какой-то файл записать не удалось (причина
+    уже выведена save_data).
+    """
+    if not (save_data(books_file, books) and save_data(users_file, users)):
+        return False
+    # Старые записи журнала применились бы поверх нового снимка
+    try:
+        Journal(users_file + '.wal').reset()
+    except OSError as e:
+        print(f"Ошибка очистки журнала {users_file}.wal: {e}")
+        return False
+    return True
+
+
+def write_sqlite(books: list, users: dict, database_path: str) -> bool:
+    """Заменяет содержимое базы SQLite. Возвращает False, если записать не удалось"""
+    try:
+        database = SQLiteDatabase(database_path)
+        try:
+            migrate_from_json(database, users, books)
+        finally:
+            database.close()
+    except sqlite3.Error as e:
+        print(f"Ошибка записи базы {database_path}: {e}")
+        return False
+    return True
@@ -12,6 +12,7 @@ from types import TracebackType
 from urllib.parse import quote as _url_quote
 
 import click
+from jinja2 import FileSystemBytecodeCache
 from werkzeug.datastructures import Headers
 from werkzeug.datastructures import ImmutableDict
 from werkzeug.exceptions import BadRequestKeyError
@@ -204,6 +205,7 @@ class Flask(App):
             "EXPLAIN_TEMPLATE_LOADING": False,
             "PREFERRED_URL_SCHEME": "http",
             "TEMPLATES_AUTO_RELOAD": None,
+            "TEMPLATES_BYTECODE_CACHE": None,
             "MAX_COOKIE_SIZE": 4093,
             "PROVIDE_AUTOMATIC_OPTIONS": True,
         }
@@ -388,6 +390,11 @@ class Flask(App):
         :attr:`jinja_options` after this will have no effect. Also adds
         Flask-related globals and filters to the environment.
 
+        .. versionchanged:: 3.1
+           A :class:`~jinja2.FileSystemBytecodeCache` is used if the
+           ``TEMPLATES_BYTECODE_CACHE`` configuration option names a
+           directory. Relative paths are inside :attr:`instance_path`.
+
         .. versionchanged:: 0.11
            ``Environment.auto_reload`` set in accordance with
            ``TEMPLATES_AUTO_RELOAD`` configuration option.
@@ -407,6 +414,14 @@ class Flask(App):
 
             options["auto_reload"] = auto_reload
 
+        if "bytecode_cache" not in options:
+            cache_dir = self.config["TEMPLATES_BYTECODE_CACHE"]
+
+            if cache_dir is not None:
+                cache_dir = os.path.join(self.instance_path, cache_dir)
+                os.makedirs(cache_dir, exist_ok=True)
+                options["bytecode_cache"] = FileSystemBytecodeCache(cache_dir)
+
         rv = self.jinja_environment(self, **options)
         rv.globals.update(
             url_for=self.url_for,
@@ -594,6 +594,7 @@ class FlaskGroup(AppGroup):
             self.add_command(run_command)
             self.add_command(shell_command)
             self.add_command(routes_command)
+            self.add_command(compile_templates_command)
 
         self._loaded_plugin_commands = False
 
@@ -1115,6 +1116,47 @@ def routes_command(sort: str, all_methods: bool) -> None:
         click.echo(template.format(*row))
 
 
+@click.command(
+    "compile-templates", short_help="Precompile templates into the bytecode cache."
+)
+@with_appcontext
+def compile_templates_command() -> None:
+    """Compile every template the app's loader can find and store the
+    bytecode in the ``TEMPLATES_BYTECODE_CACHE`` directory, so that
+    workers don't have to compile them on their first requests.
+    """
+    env = current_app.jinja_env
+
+    if env.bytecode_cache is None:
+        raise click.UsageError(
+            "The bytecode cache is disabled. Set 'TEMPLATES_BYTECODE_CACHE' to a"
+            " directory to enable it."
+        )
+
+    from jinja2 import TemplateError
+    from jinja2 import TemplateSyntaxError
+
+    names = env.list_templates()
+    failed = 0
+
+    for name in names:
+        try:
+            env.get_template(name)
+        except TemplateSyntaxError as e:
+            failed += 1
+            click.echo(f"{name}:{e.lineno}: {e.message}", err=True)
+        except (TemplateError, UnicodeDecodeError) as e:
+            # For example a template removed after listing, or a file
+            # that is not valid in the loader's encoding.
+            failed += 1
+            click.echo(f"{name}: {type(e).__name__}: {e}", err=True)
+
+    click.echo(f"Compiled {len(names) - failed} of {len(names)} templates.")
+
+    if failed:
+        raise click.ClickException(f"{failed} of {len(names)} templates failed to compile.")
+
+
 cli = FlaskGroup(
     name="flask",
     help="""\
@@ -216,6 +216,14 @@ class TagDateTime(JSONTag):
         return parse_date(value)
 
 
+#: Types that no default tag converts. Subclasses such as
+#: :class:`~markupsafe.Markup` are excluded on purpose.
+_PLAIN_TYPES = frozenset((str, int, float, bool, type(None)))
+
+#: Returned by the fast path for values it leaves to the tag system.
+_UNSUPPORTED = object()
+
+
 class TaggedJSONSerializer:
     """Serializer that uses a tag system to compactly represent objects that
     are not JSON types. Passed as the intermediate serializer to
@@ -229,9 +237,23 @@ class TaggedJSONSerializer:
     * :class:`~markupsafe.Markup`
     * :class:`~uuid.UUID`
     * :class:`~datetime.datetime`
+
+    Payloads made of plain JSON types (``str``, numbers, ``bool``,
+    ``None``, ``list`` and ``dict``) and tuples, such as the flashed
+    messages in a session, take a fast path. :meth:`dumps` tags them in
+    one pass without asking every tag in :attr:`order`. :meth:`loads`
+    skips untagging when the JSON string contains no tag key, and
+    otherwise untags each object as it is decoded. The fast path is not
+    used when a non-default tag is registered, since such a tag may
+    claim plain values.
+
+    :param fast_path: use the fast path. Output is the same either way.
+
+    .. versionchanged:: 3.1
+        Added the fast path and the ``fast_path`` parameter.
     """
 
-    __slots__ = ("tags", "order")
+    __slots__ = ("tags", "order", "fast_path", "_default_tags_only", "_tag_markers")
 
     #: Tag classes to bind when creating the serializer. Other tags can be
     #: added later using :meth:`~register`.
@@ -246,9 +268,13 @@ class TaggedJSONSerializer:
         TagDateTime,
     ]
 
-    def __init__(self) -> None:
+    def __init__(self, fast_path: bool = True) -> None:
         self.tags: dict[str, JSONTag] = {}
         self.order: list[JSONTag] = []
+        #: Use the fast path for payloads of plain JSON types and tuples.
+        self.fast_path = fast_path
+        self._default_tags_only = True
+        self._tag_markers: tuple[str, ...] = ()
 
         for cls in self.default_tags:
             self.register(cls)
@@ -286,6 +312,75 @@ class TaggedJSONSerializer:
         else:
             self.order.insert(index, tag)
 
+        self._default_tags_only = self._default_tags_only and tag_class in (
+            TaggedJSONSerializer.default_tags
+        )
+
+        # Every tag key appears as a quoted JSON string in tagged output.
+        # When all keys start with a space, one substring check covers them.
+        if all(key.startswith(" ") for key in self.tags):
+            self._tag_markers = ('" ',)
+        else:
+            self._tag_markers = tuple(f'"{key}"' for key in self.tags)
+
+    def _fast_tag(self, value: t.Any) -> t.Any:
+        """Tag a value made of plain types, lists, dicts and tuples the same
+        way :meth:`tag` would. Containers that need no tagging are returned
+        as is. Return ``_UNSUPPORTED`` for any other value.
+        """
+        kind = type(value)
+
+        if kind in _PLAIN_TYPES:
+            return value
+
+        if kind is dict:
+            if len(value) == 1 and next(iter(value)) in self.tags:
+                return _UNSUPPORTED
+
+            tagged_dict = None
+
+            for key, item in value.items():
+                if type(item) in _PLAIN_TYPES:
+                    continue
+
+                tagged = self._fast_tag(item)
+
+                if tagged is _UNSUPPORTED:
+                    return _UNSUPPORTED
+
+                if tagged is not item:
+                    if tagged_dict is None:
+                        tagged_dict = dict(value)
+
+                    tagged_dict[key] = tagged
+
+            return value if tagged_dict is None else tagged_dict
+
+        if kind is list or kind is tuple:
+            tagged_list = None
+
+            for i, item in enumerate(value):
+                if type(item) in _PLAIN_TYPES:
+                    continue
+
+                tagged = self._fast_tag(item)
+
+                if tagged is _UNSUPPORTED:
+                    return _UNSUPPORTED
+
+                if tagged is not item:
+                    if tagged_list is None:
+                        tagged_list = list(value)
+
+                    tagged_list[i] = tagged
+
+            if kind is tuple:
+                return {TagTuple.key: list(value) if tagged_list is None else tagged_list}
+
+            return value if tagged_list is None else tagged_list
+
+        return _UNSUPPORTED
+
     def tag(self, value: t.Any) -> t.Any:
         """Convert a value to a tagged representation if necessary."""
         for tag in self.order:
@@ -320,8 +415,26 @@ class TaggedJSONSerializer:
 
     def dumps(self, value: t.Any) -> str:
         """Tag the value and dump it to a compact JSON string."""
-        return dumps(self.tag(value), separators=(",", ":"))
+        if self.fast_path and self._default_tags_only:
+            tagged = self._fast_tag(value)
+            value = self.tag(value) if tagged is _UNSUPPORTED else tagged
+        else:
+            value = self.tag(value)
+
+        return dumps(value, separators=(",", ":"))
 
     def loads(self, value: str) -> t.Any:
         """Load data from a JSON string and deserialized any tagged objects."""
-        return self._untag_scan(loads(value))
+        if not (self.fast_path and self._default_tags_only):
+            return self._untag_scan(loads(value))
+
+        if isinstance(value, str):
+            for marker in self._tag_markers:
+                if marker in value:
+                    break
+            else:
+                return loads(value)
+
+        # The decoder calls the hook for inner objects first, in the same
+        # order as the untagging scan.
+        return loads(value, object_hook=self.untag)
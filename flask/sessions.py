@@ -1,7 +1,15 @@
 from __future__ import annotations
 
 import collections.abc as c
+import contextlib
 import hashlib
+import os
+import re
+import secrets
+import sqlite3
+import tempfile
+import threading
+import time
 import typing as t
 from collections.abc import MutableMapping
 from datetime import datetime
@@ -182,6 +190,18 @@ class SessionInterface:
         """
         return isinstance(obj, self.null_session_class)
 
+    def regenerate(self, session: SessionMixin) -> None:
+        """Give the session a new id when the user's privilege level
+        changes, such as on login or logout, so that an id known before
+        the change, for example one planted by an attacker, can't be used
+        after it.
+
+        The default cookie session keeps all data in the signed cookie and
+        has no id to replace, so this does nothing.
+
+        .. versionadded:: 3.1
+        """
+
     def get_cookie_name(self, app: Flask) -> str:
         """The name of the session cookie. Uses``app.config["SESSION_COOKIE_NAME"]``."""
         return app.config["SESSION_COOKIE_NAME"]  # type: ignore[no-any-return]
@@ -286,6 +306,10 @@ class SessionInterface:
 
 session_json_serializer = TaggedJSONSerializer()
 
+# Session ids generated by ServerSideSessionInterface.generate_sid. Ids
+# are also used as file names by FileSessionStore.
+_session_id_re = re.compile(r"[A-Za-z0-9_-]{16,128}")
+
 
 def _lazy_sha1(string: bytes = b"") -> t.Any:
     """Don't access ``hashlib.sha1`` until runtime. FIPS builds may not include
@@ -397,3 +421,449 @@ class SecureCookieSessionInterface(SessionInterface):
             samesite=samesite,
         )
         response.vary.add("Cookie")
+
+
+class ServerSideSession(SessionMixin):
+    """Session whose data lives in a :class:`SessionStore`, with only a
+    random session id in the cookie.
+
+    The data is loaded from the store on first access, so a request that
+    never touches the session does no store I/O at all. :attr:`new` is
+    ``True`` until the session has been saved under an id.
+
+    .. versionadded:: 3.1
+    """
+
+    def __init__(
+        self,
+        sid: str | None = None,
+        loader: t.Callable[[str], tuple[dict[str, t.Any], str, float] | None]
+        | None = None,
+    ) -> None:
+        self.sid = sid
+        self._loader = loader
+        self._data: dict[str, t.Any] | None = None if sid and loader else {}
+        #: The serialized data and expiry as loaded from the store.
+        self.stored: str | None = None
+        self.stored_expires = 0.0
+        self.new = self._data is not None
+        self.modified = False
+        self.accessed = False
+        #: Set by :meth:`ServerSideSessionInterface.regenerate`, the data
+        #: is moved to a new id when the session is saved.
+        self.regenerated = False
+
+    def _load(self) -> dict[str, t.Any]:
+        self.accessed = True
+
+        if self._data is None:
+            loaded = self._loader(self.sid)  # type: ignore[misc,arg-type]
+
+            if loaded is None:
+                # Unknown or expired id. Never adopt an id chosen by the
+                # client, a new one is generated when the session is saved.
+                self.sid = None
+                self.new = True
+                self._data = {}
+            else:
+                self._data, self.stored, self.stored_expires = loaded
+
+        return self._data
+
+    def __getitem__(self, key: str) -> t.Any:
+        return self._load()[key]
+
+    def __setitem__(self, key: str, value: t.Any) -> None:
+        self._load()[key] = value
+        self.modified = True
+
+    def __delitem__(self, key: str) -> None:
+        del self._load()[key]
+        self.modified = True
+
+    def __iter__(self) -> t.Iterator[str]:
+        return iter(self._load())
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._load()
+
+    def get(self, key: str, default: t.Any = None) -> t.Any:
+        return self._load().get(key, default)
+
+
+class SessionStore:
+    """Base class for :class:`ServerSideSessionInterface` storage
+    backends. Values are serialized session strings, expiry times are
+    Unix timestamps. Implementations must be safe to use from several
+    threads.
+
+    .. versionadded:: 3.1
+    """
+
+    def get(self, sid: str) -> tuple[str, float] | None:
+        """Return ``(value, expires)`` for a session that has not expired,
+        or ``None``.
+        """
+        raise NotImplementedError()
+
+    def set(self, sid: str, value: str, expires: float) -> None:
+        """Create or replace a session."""
+        raise NotImplementedError()
+
+    def touch(self, sid: str, expires: float) -> None:
+        """Move the expiry time of an existing session."""
+        raise NotImplementedError()
+
+    def delete(self, sid: str) -> None:
+        """Remove a session if it exists."""
+        raise NotImplementedError()
+
+    def cleanup(self, now: float, limit: int) -> int:
+        """Remove at most ``limit`` sessions that expired before ``now``
+        and return how many were removed.
+        """
+        raise NotImplementedError()
+
+
+class MemorySessionStore(SessionStore):
+    """Keep sessions in a dict in the current process. Sessions are lost
+    on restart and are not shared between worker processes.
+
+    .. versionadded:: 3.1
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._sessions: dict[str, tuple[str, float]] = {}
+
+    def get(self, sid: str) -> tuple[str, float] | None:
+        item = self._sessions.get(sid)
+
+        if item is None or item[1] <= time.time():
+            return None
+
+        return item
+
+    def set(self, sid: str, value: str, expires: float) -> None:
+        with self._lock:
+            self._sessions[sid] = (value, expires)
+
+    def touch(self, sid: str, expires: float) -> None:
+        with self._lock:
+            item = self._sessions.get(sid)
+
+            if item is not None:
+                self._sessions[sid] = (item[0], expires)
+
+    def delete(self, sid: str) -> None:
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+    def cleanup(self, now: float, limit: int) -> int:
+        with self._lock:
+            expired = [
+                sid for sid, (_, expires) in self._sessions.items() if expires <= now
+            ][:limit]
+
+            for sid in expired:
+                del self._sessions[sid]
+
+        return len(expired)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Keep sessions in a SQLite database file, shared by all worker
+    processes on the host. Each thread uses its own connection, and the
+    database runs in WAL mode so readers don't block the writer.
+
+    .. versionadded:: 3.1
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " id TEXT PRIMARY KEY, data TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+        self._connection().execute(
+            "CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+
+        return conn
+
+    def get(self, sid: str) -> tuple[str, float] | None:
+        return self._connection().execute(
+            "SELECT data, expires FROM sessions WHERE id = ? AND expires > ?",
+            (sid, time.time()),
+        ).fetchone()
+
+    def set(self, sid: str, value: str, expires: float) -> None:
+        self._connection().execute(
+            "INSERT OR REPLACE INTO sessions (id, data, expires) VALUES (?, ?, ?)",
+            (sid, value, expires),
+        )
+
+    def touch(self, sid: str, expires: float) -> None:
+        self._connection().execute(
+            "UPDATE sessions SET expires = ? WHERE id = ?", (expires, sid)
+        )
+
+    def delete(self, sid: str) -> None:
+        self._connection().execute("DELETE FROM sessions WHERE id = ?", (sid,))
+
+    def cleanup(self, now: float, limit: int) -> int:
+        return self._connection().execute(
+            "DELETE FROM sessions WHERE id IN"
+            " (SELECT id FROM sessions WHERE expires <= ? LIMIT ?)",
+            (now, limit),
+        ).rowcount
+
+
+class FileSessionStore(SessionStore):
+    """Keep each session in its own file in ``directory``. The file's
+    modification time holds the expiry time, so extending a session is a
+    single :func:`os.utime` call. Files are written to a temporary name
+    and renamed into place, so readers never see a partial session.
+
+    .. versionadded:: 3.1
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, sid: str) -> str:
+        return os.path.join(self.directory, sid)
+
+    def get(self, sid: str) -> tuple[str, float] | None:
+        try:
+            with open(self._path(sid), encoding="utf-8") as f:
+                expires = os.fstat(f.fileno()).st_mtime
+
+                if expires <= time.time():
+                    return None
+
+                return f.read(), expires
+        except OSError:
+            return None
+
+    def set(self, sid: str, value: str, expires: float) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(value)
+
+            os.utime(tmp, (expires, expires))
+            os.replace(tmp, self._path(sid))
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp)
+
+            raise
+
+    def touch(self, sid: str, expires: float) -> None:
+        with contextlib.suppress(OSError):
+            os.utime(self._path(sid), (expires, expires))
+
+    def delete(self, sid: str) -> None:
+        with contextlib.suppress(OSError):
+            os.unlink(self._path(sid))
+
+    def cleanup(self, now: float, limit: int) -> int:
+        removed = 0
+
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if removed >= limit:
+                    break
+
+                # A temporary file's mtime is its creation time, leave it
+                # to the writer unless it was abandoned long ago.
+                cutoff = now - 3600 if entry.name.startswith(".tmp-") else now
+
+                try:
+                    if entry.stat().st_mtime <= cutoff:
+                        os.unlink(entry.path)
+                        removed += 1
+                except OSError:
+                    pass
+
+        return removed
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Store session data on the server in a :class:`SessionStore` and
+    send only a random session id in the cookie.
+
+    -   Sessions are loaded lazily. A request that doesn't read or write
+        the session does no store I/O and sends no cookie.
+    -   Data is written back only if its serialized form changed,
+        including changes to nested values. Otherwise the expiry time is
+        moved forward, at most once every ``touch_interval`` seconds.
+    -   Every session expires after
+        :attr:`~flask.Flask.permanent_session_lifetime`. Expired sessions
+        are removed in batches of ``cleanup_batch``, at most once every
+        ``cleanup_interval`` seconds, while saving a session.
+    -   :meth:`regenerate` moves the session to a new id. Call it when the
+        user logs in or out.
+
+    .. code-block:: python
+
+        app.session_interface = ServerSideSessionInterface(
+            SQLiteSessionStore("sessions.db")
+        )
+
+    .. versionadded:: 3.1
+    """
+
+    serializer = session_json_serializer
+    session_class = ServerSideSession
+    #: Number of random bytes in a session id.
+    sid_bytes = 32
+
+    def __init__(
+        self,
+        store: SessionStore,
+        cleanup_interval: float = 60,
+        cleanup_batch: int = 500,
+        touch_interval: float = 60,
+    ) -> None:
+        self.store = store
+        self.cleanup_interval = cleanup_interval
+        self.cleanup_batch = cleanup_batch
+        self.touch_interval = touch_interval
+        self._cleanup_lock = threading.Lock()
+        self._next_cleanup = 0.0
+
+    def generate_sid(self) -> str:
+        return secrets.token_urlsafe(self.sid_bytes)
+
+    def _load(self, sid: str) -> tuple[dict[str, t.Any], str, float] | None:
+        item = self.store.get(sid)
+
+        if item is None:
+            return None
+
+        value, expires = item
+
+        try:
+            return self.serializer.loads(value), value, expires
+        except ValueError:
+            return None
+
+    def open_session(self, app: Flask, request: Request) -> ServerSideSession:
+        sid = request.cookies.get(self.get_cookie_name(app))
+
+        if not sid or not _session_id_re.fullmatch(sid):
+            return self.session_class()
+
+        return self.session_class(sid, self._load)
+
+    def regenerate(self, session: SessionMixin) -> None:
+        """Move the session to a new id when it is saved and delete the
+        old id from the store. Call this on login, registration and logout
+        to prevent session fixation.
+        """
+        session = t.cast(ServerSideSession, session)
+        # Loading the data marks the session as accessed, so it is saved
+        session._load()
+        session.regenerated = True
+
+    def cleanup(self) -> int:
+        """Remove a batch of expired sessions and return how many were
+        removed. Called automatically by :meth:`save_session`.
+        """
+        return self.store.cleanup(time.time(), self.cleanup_batch)
+
+    def _maybe_cleanup(self) -> None:
+        now = time.monotonic()
+
+        if now < self._next_cleanup or not self._cleanup_lock.acquire(blocking=False):
+            return
+
+        try:
+            self._next_cleanup = now + self.cleanup_interval
+            self.cleanup()
+        finally:
+            self._cleanup_lock.release()
+
+    def save_session(
+        self, app: Flask, session: SessionMixin, response: Response
+    ) -> None:
+        # The session was never loaded, so nothing can have changed.
+        if not session.accessed:
+            return
+
+        session = t.cast(ServerSideSession, session)
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        partitioned = self.get_cookie_partitioned(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+        response.vary.add("Cookie")
+
+        if not session:
+            if session.sid is not None:
+                self.store.delete(session.sid)
+                session.sid = None
+                response.delete_cookie(
+                    name,
+                    domain=domain,
+                    path=path,
+                    secure=secure,
+                    partitioned=partitioned,
+                    samesite=samesite,
+                    httponly=httponly,
+                )
+
+            return
+
+        expires = time.time() + app.permanent_session_lifetime.total_seconds()
+        value = self.serializer.dumps(dict(session))
+        set_cookie = self.should_set_cookie(app, session)
+
+        if session.regenerated and session.sid is not None:
+            self.store.delete(session.sid)
+            session.sid = None
+
+        session.regenerated = False
+
+        if session.sid is None:
+            session.sid = self.generate_sid()
+            self.store.set(session.sid, value, expires)
+            set_cookie = True
+        elif value != session.stored:
+            self.store.set(session.sid, value, expires)
+        elif expires - session.stored_expires >= self.touch_interval:
+            self.store.touch(session.sid, expires)
+
+        self._maybe_cleanup()
+
+        if set_cookie:
+            response.set_cookie(
+                name,
+                session.sid,
+                expires=self.get_expiration_time(app, session),
+                httponly=httponly,
+                domain=domain,
+                path=path,
+                secure=secure,
+                partitioned=partitioned,
+                samesite=samesite,
+            )
@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+
+# Сколько фрагментов хранится по умолчанию
+DEFAULT_MAX_ENTRIES = 4096
+
+
+class FragmentCache:
+    """Отрисованные фрагменты шаблонов с вытеснением LRU"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class FragmentCacheExtension(Extension):
+    """Тег {% cache ключ, ... %}...{% endcache %} для кэширования фрагментов.
+
+    Тело блока отрисовывается один раз для каждого набора ключей, дальше
+    берется из environment.fragment_cache. К ключам добавляются имя
+    шаблона и номер строки, поэтому одинаковые ключи в разных блоках не
+    пересекаются. В ключи нужно передать все, от чего зависит фрагмент,
+    например id и версию книги и флаги пользователя.
+    """
+
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=FragmentCache())
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        keys = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            keys.append(parser.parse_expression())
+        block = nodes.Const((parser.name, lineno))
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method('_cache_fragment', [block, nodes.List(keys)]),
+            [], [], body).set_lineno(lineno)
+
+    def _cache_fragment(self, block, keys, caller):
+        cache = self.environment.fragment_cache
+        key = (block, tuple(keys))
+        value = cache.get(key)
+        if value is None:
+            value = Markup(caller())
+            cache.set(key, value)
+        return value
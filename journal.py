@@ -0,0 +1,68 @@
+import json
+import os
+
+from tracing import span
+
+
+class Journal:
+    """Журнал изменений (write-ahead log) в формате JSON lines.
+
+    Каждая запись - одна строка JSON, дописываемая в конец файла одним
+    вызовом write, поэтому стоимость изменения не зависит от размера
+    данных. Строка, оборванная сбоем посреди записи, при чтении
+    отбрасывается и обрезается.
+    """
+
+    def __init__(self, path: str, fsync: bool = True):
+        self.path = path
+        self.fsync = fsync
+
+    def append(self, record: dict) -> int:
+        """Дописывает запись и возвращает новый размер журнала"""
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with span('storage'):
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+            try:
+                os.write(fd, line.encode('utf-8'))
+                if self.fsync:
+                    os.fsync(fd)
+                return os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+
+    def size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def read(self, offset: int = 0):
+        """Читает записи начиная с offset. Возвращает (записи, новое смещение)"""
+        try:
+            with span('storage'), open(self.path, 'rb') as f:
+                f.seek(offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return [], 0
+        records = []
+        position = offset
+        for line in chunk.splitlines(keepends=True):
+            if not line.endswith(b'\n'):
+                # Хвост, оборванный сбоем во время записи
+                break
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                print(f"Пропущена поврежденная запись журнала {self.path} на позиции {position}")
+            position += len(line)
+        return records, position
+
+    def repair(self, valid_size: int):
+        """Обрезает оборванный хвост после последней целой записи"""
+        if self.size() > valid_size:
+            os.truncate(self.path, valid_size)
+
+    def reset(self):
+        """Очищает журнал после переноса записей в снимок"""
+        if self.size():
+            os.truncate(self.path, 0)
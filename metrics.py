@@ -0,0 +1,143 @@
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, request
+
+
+# Границы корзин гистограммы времени ответа, в секундах
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+PREFIX = 'library_'
+
+
+def _label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value) -> str:
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+class _Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class RequestMetrics:
+    """Метрики запросов по маршрутам в формате Prometheus.
+
+    Для каждого endpoint считаются гистограмма времени ответа, число
+    ответов по кодам статуса и число запросов в обработке. Начало
+    запроса отмечается в before_request (Flask.preprocess_request),
+    время и статус - в after_request (Flask.process_response), а
+    счетчик запросов в обработке уменьшается в teardown_request, который
+    вызывается и после необработанного исключения. Для потоковых ответов
+    время измеряется до отправки первого байта.
+
+    На запрос приходится пара вызовов time.perf_counter(), поиск корзины
+    и несколько операций со словарями под одной блокировкой. Метрики
+    хранятся в памяти процесса, каждый процесс сервера отдает свои.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._statuses = {}
+        self._in_flight = {}
+        self._collectors = []
+
+    def init_app(self, app):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def add_collector(self, collector):
+        """Добавляет функцию, которая возвращает [(имя, тип, справка, [(метки, значение)])]"""
+        self._collectors.append(collector)
+
+    def _before_request(self):
+        endpoint = request.endpoint or 'unmatched'
+        # [endpoint, время начала]; время обнуляется, когда ответ учтен
+        g._request_metrics = [endpoint, time.perf_counter()]
+        with self._lock:
+            self._in_flight[endpoint] = self._in_flight.get(endpoint, 0) + 1
+
+    def _after_request(self, response):
+        state = g.get('_request_metrics')
+        if state is None or state[1] is None:
+            return response
+        endpoint, started = state
+        elapsed = time.perf_counter() - started
+        state[1] = None
+        index = bisect_left(self.buckets, elapsed)
+        key = (endpoint, response.status_code)
+        with self._lock:
+            histogram = self._histograms.get(endpoint)
+            if histogram is None:
+                histogram = self._histograms[endpoint] = _Histogram(len(self.buckets) + 1)
+            histogram.counts[index] += 1
+            histogram.sum += elapsed
+            histogram.count += 1
+            self._statuses[key] = self._statuses.get(key, 0) + 1
+        return response
+
+    def _teardown_request(self, exc):
+        state = g.pop('_request_metrics', None)
+        if state is None:
+            return
+        with self._lock:
+            self._in_flight[state[0]] -= 1
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus"""
+        with self._lock:
+            histograms = {endpoint: (list(h.counts), h.sum, h.count)
+                          for endpoint, h in self._histograms.items()}
+            statuses = dict(self._statuses)
+            in_flight = dict(self._in_flight)
+
+        lines = [
+            f'# HELP {PREFIX}http_request_duration_seconds Время обработки запроса по маршрутам',
+            f'# TYPE {PREFIX}http_request_duration_seconds histogram',
+        ]
+        for endpoint, (counts, total, count) in sorted(histograms.items()):
+            label = _label(endpoint)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{PREFIX}http_request_duration_seconds_bucket'
+                             f'{{endpoint="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{PREFIX}http_request_duration_seconds_bucket'
+                         f'{{endpoint="{label}",le="+Inf"}} {count}')
+            lines.append(f'{PREFIX}http_request_duration_seconds_sum{{endpoint="{label}"}} {total!r}')
+            lines.append(f'{PREFIX}http_request_duration_seconds_count{{endpoint="{label}"}} {count}')
+
+        lines.append(f'# HELP {PREFIX}http_requests_total Число ответов по маршрутам и кодам статуса')
+        lines.append(f'# TYPE {PREFIX}http_requests_total counter')
+        for (endpoint, status), count in sorted(statuses.items()):
+            lines.append(f'{PREFIX}http_requests_total'
+                         f'{{endpoint="{_label(endpoint)}",status="{status}"}} {count}')
+
+        lines.append(f'# HELP {PREFIX}http_requests_in_flight Запросы в обработке')
+        lines.append(f'# TYPE {PREFIX}http_requests_in_flight gauge')
+        for endpoint, count in sorted(in_flight.items()):
+            lines.append(f'{PREFIX}http_requests_in_flight{{endpoint="{_label(endpoint)}"}} {count}')
+
+        for collector in self._collectors:
+            for name, kind, help_text, samples in collector():
+                lines.append(f'# HELP {PREFIX}{name} {help_text}')
+                lines.append(f'# TYPE {PREFIX}{name} {kind}')
+                for labels, value in samples:
+                    label_text = ','.join(f'{k}="{_label(v)}"' for k, v in labels.items())
+                    if label_text:
+                        label_text = '{' + label_text + '}'
+                    lines.append(f'{PREFIX}{name}{label_text} {_number(value)}')
+        return '\n'.join(lines) + '\n'
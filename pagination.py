@@ -0,0 +1,97 @@
+import base64
+import binascii
+import json
+import math
+
+
+def encode_cursor(offset: int, after_id) -> str:
+    """Кодирует позицию страницы в непрозрачную строку"""
+    raw = json.dumps({'o': offset, 'a': after_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """Возвращает (offset, after_id) или None для испорченного курсора"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        offset, after_id = data['o'], data.get('a')
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        return None
+    # bool - подкласс int, а id книги курсора ищется в словаре позиций
+    if type(offset) is not int or offset < 0:
+        return None
+    if after_id is not None and type(after_id) is not int:
+        return None
+    return offset, after_id
+
+
+class Page:
+    """Одна страница упорядоченного списка id книг"""
+
+    def __init__(self, ids: list, total: int, page: int, limit: int, offset: int):
+        self.ids = ids
+        self.total = total
+        self.page = page
+        self.limit = limit
+        self.offset = offset
+
+    @property
+    def pages(self) -> int:
+        return max(1, math.ceil(self.total / self.limit))
+
+    @property
+    def has_prev(self) -> bool:
+        return self.offset > 0
+
+    @property
+    def has_next(self) -> bool:
+        return self.offset + len(self.ids) < self.total
+
+    @property
+    def next_cursor(self):
+        if not self.has_next:
+            return None
+        return encode_cursor(self.offset + len(self.ids), self.ids[-1] if self.ids else None)
+
+    def iter_pages(self, around: int = 2):
+        """Номера страниц для навигации; None обозначает пропуск"""
+        last = self.pages
+        shown = {1, last, *range(self.page - around, self.page + around + 1)}
+        previous = 0
+        for number in sorted(n for n in shown if 1 <= n <= last):
+            if number - previous > 1:
+                yield None
+            yield number
+            previous = number
+
+
+def paginate(ids: list, page: int = 1, limit: int = 24, cursor: str = None,
+             rank: dict = None) -> Page:
+    """Вырезает страницу из упорядоченного списка id.
+
+    Курсор указывает на книгу, после которой начинается страница, поэтому
+    добавление и удаление книг перед ней не сдвигают выдачу. Если этой
+    книги больше нет в списке, используется сохраненное смещение.
+    Номер страницы или курсор за концом списка дают последнюю страницу.
+    rank (id → позиция в ids) ускоряет поиск книги курсора.
+    """
+    offset = (max(page, 1) - 1) * limit
+    if cursor:
+        decoded = decode_cursor(cursor)
+        if decoded is not None:
+            offset, after_id = decoded
+            if after_id is not None:
+                if rank is not None:
+                    position = rank.get(after_id)
+                else:
+                    try:
+                        position = ids.index(after_id)
+                    except ValueError:
+                        position = None
+                if position is not None:
+                    offset = position + 1
+    offset = max(0, offset)
+    if offset >= len(ids):
+        offset = max(0, (math.ceil(len(ids) / limit) - 1) * limit)
+    return Page(ids[offset:offset + limit], len(ids), offset // limit + 1, limit, offset)
@@ -0,0 +1,126 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    """Очередь хеширования заполнена или результат не дождался таймаута"""
+
+
+class PasswordHasher:
+    """Хеширование паролей в отдельном пуле потоков ограниченного размера.
+
+    scrypt и pbkdf2 из hashlib отпускают GIL, поэтому хеширование идет
+    параллельно с другими запросами, но одновременно считается не больше
+    workers хешей. Если в очереди уже max_queue задач, новая сразу
+    отклоняется с HasherBusy, и запрос получает 503 вместо того, чтобы
+    занимать поток сервера в ожидании.
+
+    method - строка метода для generate_password_hash, например
+    'scrypt:32768:8:1' или 'pbkdf2:sha256:600000'.
+    """
+
+    def __init__(self, method: str = 'scrypt', workers: int = 2,
+                 max_queue: int = 16, timeout: float = 10):
+        self.method = method
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix='password-hasher')
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._run_seconds = 0.0
+        self._method_prefix = None
+
+    def _run(self, func, args, submitted_at: float):
+        started_at = time.perf_counter()
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+            wait = started_at - submitted_at
+            self._wait_seconds += wait
+            self._max_wait_seconds = max(self._max_wait_seconds, wait)
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+                self._run_seconds += time.perf_counter() - started_at
+
+    def submit(self, func, *args):
+        """Ставит func(*args) в очередь пула и возвращает Future"""
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._rejected += 1
+                raise HasherBusy()
+            self._queued += 1
+        return self._executor.submit(self._run, func, args, time.perf_counter())
+
+    def _call(self, func, *args):
+        future = self.submit(func, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # Задача, которая еще не началась, пулу больше не нужна
+            if future.cancel():
+                with self._lock:
+                    self._queued -= 1
+            with self._lock:
+                self._timed_out += 1
+            raise HasherBusy()
+
+    def hash(self, password: str) -> str:
+        """Хеширует пароль настроенным методом"""
+        return self._call(generate_password_hash, password, self.method)
+
+    def check(self, password_hash: str, password: str) -> bool:
+        """Проверяет пароль по хешу"""
+        return self._call(check_password_hash, password_hash, password)
+
+    def _verify(self, password_hash: str, password: str) -> tuple:
+        if not check_password_hash(password_hash, password):
+            return False, False
+        return True, self.needs_rehash(password_hash)
+
+    def verify(self, password_hash: str, password: str) -> tuple:
+        """Проверяет пароль и возвращает (пароль верен, хеш пора пересчитать)"""
+        return self._call(self._verify, password_hash, password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """True, если хеш посчитан не текущим методом или с другими параметрами"""
+        if self._method_prefix is None:
+            # Полную строку параметров (например 'scrypt:32768:8:1') берем
+            # из настоящего хеша, чтобы не повторять умолчания werkzeug.
+            # Через verify() это происходит один раз в потоке пула
+            self._method_prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._method_prefix
+
+    def stats(self) -> dict:
+        """Счетчики очереди для мониторинга"""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'queued': self._queued,
+                'active': self._active,
+                'completed': self._completed,
+                'rejected': self._rejected,
+                'timed_out': self._timed_out,
+                'wait_seconds_total': self._wait_seconds,
+                'wait_seconds_max': self._max_wait_seconds,
+                'run_seconds_total': self._run_seconds,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,123 @@
+import http.cookiejar
+import os
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+from collections import Counter
+
+from flask import request
+
+
+# Самый короткий интервал выборки: чаще профилировщик сам занимал бы процессор
+MIN_INTERVAL = 0.001
+
+
+class ProfilerBusy(Exception):
+    """Профилирование уже идет в этом процессе"""
+
+
+class SamplingProfiler:
+    """Статистический профилировщик стеков работающего процесса.
+
+    profile() в течение заданного времени каждые interval секунд снимает
+    стеки всех потоков через sys._current_frames() и считает одинаковые
+    стеки. Потоки, которые обрабатывают запрос, подписываются endpoint
+    этого запроса: before_request запоминает его по идентификатору
+    потока, teardown_request забывает. Остальные потоки (пул хеширования
+    паролей, простаивающие потоки сервера) учитываются только с
+    all_threads=True и подписываются именем потока.
+
+    Выборка идет в потоке, вызвавшем profile(), и сам этот поток в
+    результат не попадает. Одновременно в процессе идет не больше одного
+    профилирования, второе получает ProfilerBusy.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._frame_labels = {}
+
+    def init_app(self, app):
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+
+    def _before_request(self):
+        self._requests[threading.get_ident()] = request.endpoint or 'unmatched'
+
+    def _teardown_request(self, exc):
+        self._requests.pop(threading.get_ident(), None)
+
+    def _frame_label(self, code) -> str:
+        label = self._frame_labels.get(code)
+        if label is None:
+            label = f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+            self._frame_labels[code] = label
+        return label
+
+    def _stack(self, frame) -> str:
+        labels = []
+        while frame is not None:
+            labels.append(self._frame_label(frame.f_code))
+            frame = frame.f_back
+        labels.reverse()
+        return ';'.join(labels)
+
+    def profile(self, seconds: float, interval: float = None, all_threads: bool = False) -> Counter:
+        """Собирает стеки seconds секунд. Возвращает Counter {(метка потока, стек): число выборок}"""
+        if interval is None:
+            interval = self.interval
+        if interval < MIN_INTERVAL:
+            raise ValueError(f'Интервал выборки не может быть меньше {MIN_INTERVAL} с')
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy()
+        try:
+            own_ident = threading.get_ident()
+            thread_names = {}
+            samples = Counter()
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                frames = sys._current_frames()
+                for ident, frame in frames.items():
+                    if ident == own_ident:
+                        continue
+                    label = self._requests.get(ident)
+                    if label is None:
+                        if not all_threads:
+                            continue
+                        if ident not in thread_names:
+                            thread_names = {t.ident: t.name for t in threading.enumerate()}
+                        label = thread_names.get(ident, 'thread')
+                    samples[(label, self._stack(frame))] += 1
+                # Снятые кадры не должны жить до следующей выборки
+                del frames, frame
+                time.sleep(interval)
+            return samples
+        finally:
+            self._lock.release()
+
+
+def collapse(samples: Counter) -> str:
+    """Стеки в свернутом формате flamegraph.pl и speedscope: "метка;кадр;кадр число" """
+    return ''.join(f'{label};{stack} {count}\n'
+                   for (label, stack), count in samples.most_common())
+
+
+def fetch_profile(base_url: str, username: str, password: str, seconds: float,
+                  interval: float = None, all_threads: bool = False) -> str:
+    """Входит на работающий сервер и получает с него свернутые стеки /admin/profile"""
+    opener = urllib.request.build_opener(
+        urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    base_url = base_url.rstrip('/')
+    form = urllib.parse.urlencode({'username': username, 'password': password}).encode()
+    opener.open(f'{base_url}/login', form, timeout=30).close()
+    params = {'seconds': seconds}
+    if interval is not None:
+        params['interval'] = interval
+    if all_threads:
+        params['threads'] = 'all'
+    url = f'{base_url}/admin/profile?{urllib.parse.urlencode(params)}'
+    with opener.open(url, timeout=seconds + 30) as response:
+        return response.read().decode('utf-8')
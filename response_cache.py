@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """Кэш готовых страниц с временем жизни и вытеснением LRU.
+
+    Ключ - маршрут, его аргументы и нормализованные параметры запроса.
+    Записи живут ttl секунд, при переполнении выбрасываются самые давно
+    использованные. clear() вызывается при изменении каталога, а номер
+    поколения не дает сохранить страницу, отрисованную по старым данным,
+    если каталог изменился во время отрисовки.
+    """
+
+    def __init__(self, ttl: float = 60, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def attach(self, store):
+        """Очищает кэш при каждом изменении каталога"""
+        store.subscribe(lambda event, book: self.clear())
+
+    @staticmethod
+    def make_key(endpoint: str, view_args, args) -> tuple:
+        """Ключ страницы: параметры сортируются, пустые значения отбрасываются"""
+        params = sorted((name, value) for name, value in args.items(multi=True) if value)
+        return endpoint, tuple(sorted((view_args or {}).items())), tuple(params)
+
+    def get(self, key):
+        """Возвращает сохраненную страницу или None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, generation: int):
+        """Сохраняет страницу, если каталог не менялся с начала ее отрисовки"""
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
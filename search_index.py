@@ -0,0 +1,279 @@
+import heapq
+import re
+import threading
+from bisect import bisect_left, insort
+
+from catalog_store import CatalogIndex
+
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Вес слова в зависимости от поля книги, где оно встретилось
+FIELD_WEIGHTS = {
+    'title': 3.0,
+    'author': 2.0,
+    'description': 1.0,
+}
+
+# Множители для разных видов совпадения слова запроса со словом книги
+EXACT_MATCH = 1.0
+STEM_MATCH = 0.6
+PREFIX_MATCH = 0.5
+
+# Окончания для упрощенного стемминга русских слов, длинные первыми
+RUSSIAN_ENDINGS = sorted((
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ых', 'их',
+    'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ий', 'ый', 'ой', 'ей', 'ом', 'ем',
+    'ам', 'ям', 'ах', 'ях', 'ую', 'юю', 'ов', 'ев', 'ия', 'ью',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True)
+MIN_STEM_LENGTH = 3
+
+
+def normalize(text: str) -> str:
+    """Приводит текст к виду для поиска: без регистра, ё → е"""
+    return text.casefold().replace('ё', 'е')
+
+
+def tokenize(text: str) -> list:
+    """Разбивает текст на нормализованные слова"""
+    return TOKEN_RE.findall(normalize(text))
+
+
+def stem(word: str) -> str:
+    """Отрезает типичное окончание, оставляя не меньше MIN_STEM_LENGTH букв"""
+    for ending in RUSSIAN_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM_LENGTH:
+            return word[:-len(ending)]
+    return word
+
+
+class SearchIndex(CatalogIndex):
+    """Инвертированный индекс по названию, автору и описанию книг.
+
+    Для каждого слова хранится словарь book_id → вес. Слово запроса
+    совпадает со словом книги точно, по общей основе (война/войну) или
+    как префикс (толс → толстой), что нужно для поиска по мере набора.
+    Все слова запроса должны найтись в книге, результаты сортируются по
+    сумме весов, при равенстве - по порядку каталога.
+
+    Индекс подписывается на изменения CatalogStore и обновляется по
+    одной книге, без полной перестройки. Позиции книг в CatalogStore при
+    удалении не сдвигаются, поэтому упорядоченные постинги (_ranked)
+    тоже правятся по одной записи, а не считаются заново.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = {}
+        self._vocabulary = []
+        self._stems = {}
+        self._term_stems = {}
+        self._book_terms = {}
+        self._book_positions = {}
+        self._ranked = {}
+        self._store = None
+
+    def rebuild(self):
+        """Перестраивает индекс по всему каталогу"""
+        with self._lock:
+            self._postings = {}
+            self._book_terms = {}
+            self._book_positions = {}
+            self._ranked = {}
+            for book in self._store:
+                self._index_book(book)
+            # Словарь сортируется один раз, а не вставкой каждого слова
+            self._vocabulary = sorted(self._postings)
+            self._stems = {}
+            self._term_stems = {}
+            for term in self._vocabulary:
+                self._add_stem(term)
+
+    @staticmethod
+    def _book_weights(book: dict) -> dict:
+        weights = {}
+        for field, field_weight in FIELD_WEIGHTS.items():
+            for term in set(tokenize(book.get(field) or '')):
+                weights[term] = weights.get(term, 0.0) + field_weight
+        return weights
+
+    def _index_book(self, book: dict) -> list:
+        """Добавляет постинги книги и возвращает слова, которых не было в индексе"""
+        book_id = book['id']
+        weights = self._book_weights(book)
+        position = self._position(book_id)
+        all_postings = self._postings
+        all_ranked = self._ranked
+        new_terms = []
+        for term, weight in weights.items():
+            postings = all_postings.get(term)
+            if postings is None:
+                postings = all_postings[term] = {}
+                new_terms.append(term)
+            elif all_ranked:
+                ranked = all_ranked.get(term)
+                if ranked is not None:
+                    insort(ranked, (-weight, position, book_id))
+            postings[book_id] = weight
+        self._book_terms[book_id] = weights
+        self._book_positions[book_id] = position
+        return new_terms
+
+    def _add_stem(self, term: str):
+        term_stem = self._term_stems[term] = stem(term)
+        self._stems.setdefault(term_stem, set()).add(term)
+
+    def add_book(self, book: dict):
+        """Индексирует книгу (повторный вызов переиндексирует ее)"""
+        with self._lock:
+            if book['id'] in self._book_terms:
+                self.remove_book(book['id'])
+            for term in self._index_book(book):
+                insort(self._vocabulary, term)
+                self._add_stem(term)
+
+    def remove_book(self, book_id: int):
+        with self._lock:
+            weights = self._book_terms.pop(book_id, None)
+            if weights is None:
+                return
+            # Позиция запомнена при индексации: из каталога книга уже удалена
+            position = self._book_positions.pop(book_id)
+            for term, weight in weights.items():
+                ranked = self._ranked.get(term)
+                if ranked is not None:
+                    del ranked[bisect_left(ranked, (-weight, position, book_id))]
+                postings = self._postings[term]
+                del postings[book_id]
+                if not postings:
+                    self._ranked.pop(term, None)
+                    del self._postings[term]
+                    del self._vocabulary[bisect_left(self._vocabulary, term)]
+                    term_stem = self._term_stems.pop(term)
+                    stem_terms = self._stems[term_stem]
+                    stem_terms.discard(term)
+                    if not stem_terms:
+                        del self._stems[term_stem]
+
+    def _position(self, book_id: int):
+        if self._store is None:
+            return book_id
+        return self._store.position(book_id)
+
+    def _matching_terms(self, token: str) -> list:
+        """Возвращает [(слово индекса, множитель совпадения)] для слова запроса"""
+        terms = [(term, EXACT_MATCH if term == token else STEM_MATCH)
+                 for term in self._stems.get(stem(token), ())]
+        seen = {term for term, _ in terms}
+        vocabulary = self._vocabulary
+        i = bisect_left(vocabulary, token)
+        while i < len(vocabulary) and vocabulary[i].startswith(token):
+            if vocabulary[i] not in seen:
+                terms.append((vocabulary[i], PREFIX_MATCH))
+            i += 1
+        return terms
+
+    def _postings_size(self, terms: list) -> int:
+        return sum(len(self._postings[term]) for term, _ in terms)
+
+    def _books_with(self, terms: list, within: set = None) -> set:
+        """Книги, в которых есть хоть одно из совпавших слов; только среди within, если задано"""
+        all_postings = [self._postings[term] for term, _ in terms]
+        if within is None:
+            return set().union(*all_postings)
+        if len(within) * len(all_postings) < self._postings_size(terms):
+            return {book_id for book_id in within
+                    if any(book_id in postings for postings in all_postings)}
+        found = set()
+        for postings in all_postings:
+            found.update(within.intersection(postings))
+        return found
+
+    def _add_best_scores(self, scores: dict, terms: list) -> dict:
+        """Прибавляет к весам книг scores лучший вес одного слова запроса.
+
+        В каждой книге scores должно быть хотя бы одно из слов terms.
+        """
+        best = {}
+        get = best.get
+        for term, factor in terms:
+            postings = self._postings[term]
+            if len(postings) > len(scores):
+                postings = {book_id: postings[book_id] for book_id in scores.keys() & postings.keys()}
+            for book_id, weight in postings.items():
+                score = weight * factor
+                if score > get(book_id, 0.0) and book_id in scores:
+                    best[book_id] = score
+        return {book_id: score + best[book_id] for book_id, score in scores.items()}
+
+    def _score_terms(self, terms: list) -> dict:
+        """Возвращает book_id → лучший вес по списку совпавших слов"""
+        matches = {}
+        for term, factor in terms:
+            for book_id, weight in self._postings[term].items():
+                score = weight * factor
+                if score > matches.get(book_id, 0.0):
+                    matches[book_id] = score
+        return matches
+
+    def _ranked_postings(self, term: str) -> list:
+        """Постинги слова, упорядоченные по убыванию веса и порядку каталога"""
+        ranked = self._ranked.get(term)
+        if ranked is None:
+            position = self._position
+            ranked = self._ranked[term] = sorted(
+                (-weight, position(book_id), book_id)
+                for book_id, weight in self._postings[term].items())
+        return ranked
+
+    def _top_single(self, terms: list, limit: int) -> list:
+        """Первые limit книг для запроса из одного слова без подсчета всех совпадений.
+
+        Постинги каждого слова упорядочены по весу, поэтому при слиянии
+        первое появление книги несет ее лучший вес, и можно остановиться,
+        набрав limit разных книг.
+        """
+        streams = [((weight * factor, position, book_id)
+                    for weight, position, book_id in self._ranked_postings(term))
+                   for term, factor in terms]
+        result = []
+        seen = set()
+        for _, _, book_id in heapq.merge(*streams):
+            if book_id not in seen:
+                seen.add(book_id)
+                result.append(book_id)
+                if len(result) == limit:
+                    break
+        return result
+
+    def search(self, query: str, limit=None) -> list:
+        """Возвращает id книг, подходящих под запрос, по убыванию релевантности"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+        with self._lock:
+            token_terms = [self._matching_terms(token) for token in tokens]
+            if len(tokens) == 1:
+                if limit is not None:
+                    return self._top_single(token_terms[0], limit)
+                scores = self._score_terms(token_terms[0])
+            else:
+                # Пересекаем множества книг слов запроса, начиная с самого
+                # редкого, и считаем веса только у оставшихся книг
+                token_terms.sort(key=self._postings_size)
+                books = None
+                for terms in token_terms:
+                    books = self._books_with(terms, books)
+                    if not books:
+                        return []
+                scores = dict.fromkeys(books, 0.0)
+                for terms in token_terms:
+                    scores = self._add_best_scores(scores, terms)
+        position = self._position
+        if limit is not None:
+            return heapq.nsmallest(limit, scores, key=lambda book_id: (-scores[book_id], position(book_id)))
+        # Сортировка устойчива: при равных весах остается порядок каталога
+        ranked = sorted(scores, key=position)
+        ranked.sort(key=scores.__getitem__, reverse=True)
+        return ranked
@@ -0,0 +1,92 @@
+import threading
+
+from search_index import normalize
+
+
+def _text_key(field):
+    return lambda book: normalize(book.get(field) or '')
+
+
+def _year_key(book):
+    # Книги без года идут в конце
+    year = book.get('year')
+    return (year is None, year or 0)
+
+
+# Порядки сортировки каталога. Пустая строка - порядок books.json.
+SORT_KEYS = {
+    'title': _text_key('title'),
+    'author': _text_key('author'),
+    'year': _year_key,
+}
+
+
+class SortIndex:
+    """Готовые упорядоченные списки id книг для сортировок каталога.
+
+    Порядок устойчивый: при равных ключах книги идут в порядке каталога.
+    Списки считаются лениво и сбрасываются при изменениях каталога,
+    которые затрагивают ключи сортировки (смена доступности книги их не
+    сбрасывает).
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._orders = {}
+        self._ranks = {}
+        self._keys = {}
+        self._store = None
+
+    def attach(self, store):
+        """Подписывается на изменения каталога"""
+        self._store = store
+        self._keys = {book['id']: self._sort_keys(book) for book in store}
+        store.subscribe(self._on_catalog_change)
+
+    @staticmethod
+    def _sort_keys(book: dict) -> tuple:
+        return tuple(key(book) for key in SORT_KEYS.values())
+
+    def _on_catalog_change(self, event: str, book):
+        with self._lock:
+            if event == 'update':
+                keys = self._sort_keys(book)
+                if self._keys.get(book['id']) == keys:
+                    return
+                self._keys[book['id']] = keys
+            elif event == 'add':
+                self._keys[book['id']] = self._sort_keys(book)
+            elif event == 'remove':
+                self._keys.pop(book['id'], None)
+            else:
+                self._keys = {b['id']: self._sort_keys(b) for b in self._store}
+            self._orders = {}
+            self._ranks = {}
+
+    def order(self, sort: str = '') -> list:
+        """Все id каталога в заданном порядке"""
+        with self._lock:
+            ids = self._orders.get(sort)
+            if ids is None:
+                if sort:
+                    key = SORT_KEYS[sort]
+                    position = self._store.position
+                    books = sorted(self._store, key=lambda book: (key(book), position(book['id'])))
+                else:
+                    books = self._store
+                ids = self._orders[sort] = [book['id'] for book in books]
+            return ids
+
+    def rank(self, sort: str = '') -> dict:
+        """id книги → ее место в заданном порядке"""
+        with self._lock:
+            ranks = self._ranks.get(sort)
+            if ranks is None:
+                ranks = self._ranks[sort] = {book_id: i for i, book_id in enumerate(self.order(sort))}
+            return ranks
+
+    def sort_ids(self, book_ids, sort: str = '') -> list:
+        """Упорядочивает подмножество id каталога"""
+        if sort:
+            return sorted(book_ids, key=self.rank(sort).__getitem__)
+        return sorted(book_ids, key=self._store.position)
@@ -0,0 +1,448 @@
+import copy
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from tracing import span
+from user_repository import EmailTaken, User, normalize_email
+from versions import VersionCounter
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    email TEXT NOT NULL DEFAULT '',
+    email_key TEXT NOT NULL DEFAULT '',
+    password TEXT NOT NULL DEFAULT '',
+    full_name TEXT NOT NULL DEFAULT '',
+    grade TEXT NOT NULL DEFAULT '',
+    registered_at TEXT NOT NULL DEFAULT '',
+    notifications TEXT,
+    extra TEXT
+);
+
+CREATE TABLE IF NOT EXISTS favorites (
+    username TEXT NOT NULL REFERENCES users (username) ON DELETE CASCADE,
+    book_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (username, book_id)
+);
+CREATE INDEX IF NOT EXISTS favorites_book ON favorites (book_id);
+
+CREATE TABLE IF NOT EXISTS reading (
+    username TEXT NOT NULL REFERENCES users (username) ON DELETE CASCADE,
+    book_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    started_at TEXT,
+    PRIMARY KEY (username, book_id)
+);
+CREATE INDEX IF NOT EXISTS reading_book ON reading (book_id);
+
+CREATE TABLE IF NOT EXISTS history (
+    username TEXT NOT NULL REFERENCES users (username) ON DELETE CASCADE,
+    book_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    finished_at TEXT,
+    PRIMARY KEY (username, book_id)
+);
+CREATE INDEX IF NOT EXISTS history_book ON history (book_id);
+
+CREATE TABLE IF NOT EXISTS books (
+    id INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    author TEXT NOT NULL DEFAULT '',
+    year INTEGER,
+    description TEXT NOT NULL DEFAULT '',
+    image TEXT NOT NULL DEFAULT '',
+    available INTEGER NOT NULL DEFAULT 1,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS books_position ON books (position);
+
+CREATE TABLE IF NOT EXISTS book_themes (
+    book_id INTEGER NOT NULL REFERENCES books (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    theme TEXT NOT NULL,
+    PRIMARY KEY (book_id, theme)
+);
+CREATE INDEX IF NOT EXISTS book_themes_theme ON book_themes (theme);
+
+-- Счетчик изменений таблицы users из всех соединений и процессов.
+-- Любая запись пользователя меняет его строку в users, поэтому
+-- триггеров на этой таблице достаточно
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO counters (name, value) VALUES ('users', 0);
+CREATE TRIGGER IF NOT EXISTS users_insert_counter AFTER INSERT ON users BEGIN
+    UPDATE counters SET value = value + 1 WHERE name = 'users';
+END;
+CREATE TRIGGER IF NOT EXISTS users_update_counter AFTER UPDATE ON users BEGIN
+    UPDATE counters SET value = value + 1 WHERE name = 'users';
+END;
+CREATE TRIGGER IF NOT EXISTS users_delete_counter AFTER DELETE ON users BEGIN
+    UPDATE counters SET value = value + 1 WHERE name = 'users';
+END;
+"""
+
+# Поля записи пользователя, которые хранятся в отдельных колонках и
+# таблицах. Остальные поля (например, устаревшие borrowed_books)
+# сохраняются как JSON в колонке extra.
+USER_COLUMNS = ('email', 'password', 'full_name', 'grade', 'registered_at')
+USER_LIST_FIELDS = ('favorites', 'reading_books', 'reading_dates',
+                    'reading_history', 'history_dates', 'notifications')
+BOOK_COLUMNS = ('title', 'author', 'year', 'description', 'image')
+
+
+class SQLiteDatabase:
+    """Соединения с базой SQLite, по одному на поток.
+
+    База работает в режиме WAL: читатели не блокируют писателя, и
+    несколько процессов могут работать с одним файлом.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self.connection().executescript(SCHEMA)
+        self._upgrade_schema()
+
+    def _upgrade_schema(self):
+        """Добавляет в базу, созданную прежней версией, колонку email_key"""
+        conn = self.connection()
+        columns = {row['name'] for row in conn.execute('PRAGMA table_info(users)')}
+        if 'email_key' not in columns:
+            with self.transaction() as conn:
+                conn.execute("ALTER TABLE users ADD COLUMN email_key TEXT NOT NULL DEFAULT ''")
+                conn.executemany('UPDATE users SET email_key = ? WHERE username = ?', [
+                    (normalize_email(row['email']), row['username'])
+                    for row in conn.execute('SELECT username, email FROM users').fetchall()])
+                conn.execute('DROP INDEX IF EXISTS users_email')
+        # Не UNIQUE: в старых данных встречаются повторяющиеся email,
+        # уникальность новых проверяется в транзакции записи
+        conn.execute('CREATE INDEX IF NOT EXISTS users_email_key ON users (email_key)')
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Транзакция с блокировкой на запись с самого начала (BEGIN IMMEDIATE)"""
+        conn = self.connection()
+        with span('storage'):
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def _write_user(conn, username: str, data: dict, replace: bool = False):
+    """Записывает пользователя. replace=True заменяет существующую запись"""
+    extra = {k: v for k, v in data.items() if k not in USER_COLUMNS and k not in USER_LIST_FIELDS}
+    upsert = ''
+    if replace:
+        upsert = (' ON CONFLICT (username) DO UPDATE SET email = excluded.email,'
+                  ' email_key = excluded.email_key,'
+                  ' password = excluded.password, full_name = excluded.full_name,'
+                  ' grade = excluded.grade, registered_at = excluded.registered_at,'
+                  ' notifications = excluded.notifications, extra = excluded.extra')
+        for table in ('favorites', 'reading', 'history'):
+            conn.execute(f'DELETE FROM {table} WHERE username = ?', (username,))
+    conn.execute(
+        'INSERT INTO users (username, email, password, full_name, grade, registered_at, notifications, extra, email_key)'
+        ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)' + upsert,
+        (username, *(data.get(column, '') for column in USER_COLUMNS),
+         json.dumps(data['notifications'], ensure_ascii=False) if 'notifications' in data else None,
+         json.dumps(extra, ensure_ascii=False) if extra else None,
+         normalize_email(data.get('email'))))
+    conn.executemany(
+        'INSERT OR IGNORE INTO favorites (username, book_id, position) VALUES (?, ?, ?)',
+        [(username, book_id, i) for i, book_id in enumerate(data.get('favorites', []))])
+    reading_dates = data.get('reading_dates', {})
+    conn.executemany(
+        'INSERT OR IGNORE INTO reading (username, book_id, position, started_at) VALUES (?, ?, ?, ?)',
+        [(username, book_id, i, reading_dates.get(str(book_id)))
+         for i, book_id in enumerate(data.get('reading_books', []))])
+    history_dates = data.get('history_dates', {})
+    conn.executemany(
+        'INSERT OR IGNORE INTO history (username, book_id, position, finished_at) VALUES (?, ?, ?, ?)',
+        [(username, book_id, i, history_dates.get(str(book_id)))
+         for i, book_id in enumerate(data.get('reading_history', []))])
+
+
+def _check_email(conn, username: str, email: str):
+    """Выбрасывает EmailTaken, если новый email пользователя занят другим"""
+    key = normalize_email(email)
+    if not key:
+        return
+    row = conn.execute('SELECT email_key FROM users WHERE username = ?', (username,)).fetchone()
+    if row is not None and row['email_key'] == key:
+        return
+    taken = conn.execute('SELECT 1 FROM users WHERE email_key = ? AND username != ? LIMIT 1',
+                         (key, username)).fetchone()
+    if taken is not None:
+        raise EmailTaken(email)
+
+
+def _insert_book(conn, book: dict, position: int):
+    extra = {k: v for k, v in book.items()
+             if k not in BOOK_COLUMNS and k not in ('id', 'available', 'theme')}
+    conn.execute(
+        'INSERT INTO books (id, position, title, author, year, description, image, available, extra)'
+        ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        (book['id'], position, book.get('title', ''), book.get('author', ''), book.get('year'),
+         book.get('description', ''), book.get('image', ''), int(book.get('available', True)),
+         json.dumps(extra, ensure_ascii=False) if extra else None))
+    conn.executemany(
+        'INSERT OR IGNORE INTO book_themes (book_id, position, theme) VALUES (?, ?, ?)',
+        [(book['id'], i, theme) for i, theme in enumerate(book.get('theme', []))])
+
+
+class SQLiteUserRepository:
+    """Пользователи в SQLite с тем же интерфейсом, что у UserRepository.
+
+    Каждый вызов - точечный запрос по индексу, в память целиком ничего
+    не загружается. Даты из reading_dates/history_dates хранятся вместе
+    со строками reading/history, поэтому даты книг, которых нет в
+    соответствующем списке, не сохраняются.
+
+    Версии записей для version() считаются в памяти процесса. Триггеры
+    на таблице users ведут в базе общий счетчик изменений; процесс
+    помнит последнее увиденное значение (одно на процесс, а не на
+    соединение, так что новый поток тоже его сравнивает). Если счетчик
+    вырос не только из-за записей этого процесса, базу изменил другой
+    процесс, и изменившимися считаются все записи.
+
+    Email ищется по индексированной колонке email_key (без учета
+    регистра). Уникальность проверяется в той же транзакции BEGIN
+    IMMEDIATE, что и запись, поэтому две одновременные регистрации с
+    одним адресом не пройдут обе.
+    """
+
+    def __init__(self, database: SQLiteDatabase):
+        self.database = database
+        self._versions = VersionCounter()
+        self._lock = threading.Lock()
+        self._seen_changes = None
+
+    def reload(self):
+        """Совместимость с UserRepository: данные всегда читаются из базы"""
+
+    def compact(self) -> bool:
+        """Совместимость с UserRepository: журналом управляет SQLite"""
+        return True
+
+    def __len__(self) -> int:
+        return self.database.connection().execute('SELECT COUNT(*) FROM users').fetchone()[0]
+
+    def __contains__(self, username: str) -> bool:
+        row = self.database.connection().execute(
+            'SELECT 1 FROM users WHERE username = ?', (username,)).fetchone()
+        return row is not None
+
+    def usernames(self) -> list:
+        rows = self.database.connection().execute('SELECT username FROM users ORDER BY rowid')
+        return [row[0] for row in rows]
+
+    def get(self, username: str):
+        """Возвращает User или None, если пользователя нет"""
+        with span('storage'):
+            return self._read_user(username)
+
+    def _read_user(self, username: str):
+        conn = self.database.connection()
+        row = conn.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
+        if row is None:
+            return None
+        data = json.loads(row['extra']) if row['extra'] else {}
+        for column in USER_COLUMNS:
+            data[column] = row[column]
+        if row['notifications'] is not None:
+            data['notifications'] = json.loads(row['notifications'])
+        data['favorites'] = [r[0] for r in conn.execute(
+            'SELECT book_id FROM favorites WHERE username = ? ORDER BY position', (username,))]
+        reading = conn.execute(
+            'SELECT book_id, started_at FROM reading WHERE username = ? ORDER BY position',
+            (username,)).fetchall()
+        data['reading_books'] = [r[0] for r in reading]
+        data['reading_dates'] = {str(r[0]): r[1] for r in reading if r[1] is not None}
+        history = conn.execute(
+            'SELECT book_id, finished_at FROM history WHERE username = ? ORDER BY position',
+            (username,)).fetchall()
+        data['reading_history'] = [r[0] for r in history]
+        data['history_dates'] = {str(r[0]): r[1] for r in history if r[1] is not None}
+        return User(username, data)
+
+    @staticmethod
+    def _changes(conn) -> int:
+        return conn.execute("SELECT value FROM counters WHERE name = 'users'").fetchone()[0]
+
+    def _observe(self, changes: int, before: int = None):
+        """Запоминает счетчик изменений; сбрасывает версии, если базу менял другой процесс.
+
+        before - значение счетчика перед собственной записью этого процесса.
+        """
+        with self._lock:
+            seen = self._seen_changes
+            if seen is not None and changes > seen and seen != before:
+                self._versions.reset()
+            # Потоки читают счетчик без блокировки, поэтому устаревшее
+            # значение не должно откатить уже увиденное
+            if seen is None or changes > seen:
+                self._seen_changes = changes
+
+    def version(self, username: str) -> tuple:
+        """Возвращает (номер версии, время изменения) записи пользователя"""
+        self._observe(self._changes(self.database.connection()))
+        return self._versions.get(username)
+
+    def find_by_email(self, email: str):
+        """Возвращает имя пользователя с таким email (без учета регистра) или None"""
+        row = self.database.connection().execute(
+            'SELECT username FROM users WHERE email_key = ? ORDER BY rowid LIMIT 1',
+            (normalize_email(email),)).fetchone()
+        return row[0] if row else None
+
+    def create(self, username: str, data: dict):
+        """Добавляет нового пользователя. Возвращает User или None, если имя занято.
+
+        Выбрасывает EmailTaken, если email уже занят.
+        """
+        try:
+            with self.database.transaction() as conn:
+                if conn.execute('SELECT 1 FROM users WHERE username = ?', (username,)).fetchone():
+                    return None
+                _check_email(conn, username, data.get('email'))
+                before = self._changes(conn)
+                _write_user(conn, username, data)
+                after = self._changes(conn)
+        except sqlite3.IntegrityError:
+            return None
+        except sqlite3.Error as e:
+            print(f"Ошибка сохранения пользователя {username}: {e}")
+            return None
+        self._observe(after, before)
+        self._versions.bump(username)
+        return User(username, copy.deepcopy(data))
+
+    def save(self, user: User) -> bool:
+        """Сохраняет изменения пользователя. Выбрасывает EmailTaken, если новый email занят"""
+        try:
+            with self.database.transaction() as conn:
+                _check_email(conn, user.username, user.email)
+                before = self._changes(conn)
+                _write_user(conn, user.username, user.data, replace=True)
+                after = self._changes(conn)
+        except sqlite3.Error as e:
+            print(f"Ошибка сохранения пользователя {user.username}: {e}")
+            return False
+        self._observe(after, before)
+        self._versions.bump(user.username)
+        return True
+
+    def delete(self, username: str) -> bool:
+        """Удаляет пользователя"""
+        try:
+            with self.database.transaction() as conn:
+                before = self._changes(conn)
+                deleted = conn.execute('DELETE FROM users WHERE username = ?', (username,)).rowcount
+                after = self._changes(conn)
+        except sqlite3.Error as e:
+            print(f"Ошибка удаления пользователя {username}: {e}")
+            return False
+        self._observe(after, before)
+        self._versions.bump(username)
+        return deleted > 0
+
+
+class SQLiteBookStorage:
+    """Хранение каталога в таблицах books и book_themes.
+
+    Изменение одной книги обновляет только ее строки, а не весь каталог.
+    """
+
+    def __init__(self, database: SQLiteDatabase):
+        self.database = database
+
+    def load(self) -> list:
+        conn = self.database.connection()
+        themes = {}
+        for row in conn.execute('SELECT book_id, theme FROM book_themes ORDER BY book_id, position'):
+            themes.setdefault(row[0], []).append(row[1])
+        books = []
+        for row in conn.execute('SELECT * FROM books ORDER BY position'):
+            book = {'id': row['id']}
+            for column in BOOK_COLUMNS:
+                book[column] = row[column]
+            book['theme'] = themes.get(row['id'], [])
+            book['available'] = bool(row['available'])
+            if row['extra']:
+                book.update(json.loads(row['extra']))
+            books.append(book)
+        return books
+
+    def save_all(self, books: list) -> bool:
+        try:
+            with self.database.transaction() as conn:
+                conn.execute('DELETE FROM books')
+                for position, book in enumerate(books):
+                    _insert_book(conn, book, position)
+        except sqlite3.Error as e:
+            print(f"Ошибка сохранения каталога: {e}")
+            return False
+        return True
+
+    def save_book(self, book: dict, books: list) -> bool:
+        try:
+            with self.database.transaction() as conn:
+                row = conn.execute('SELECT position FROM books WHERE id = ?', (book['id'],)).fetchone()
+                if row is None:
+                    position = conn.execute('SELECT COALESCE(MAX(position), -1) + 1 FROM books').fetchone()[0]
+                else:
+                    position = row[0]
+                    conn.execute('DELETE FROM books WHERE id = ?', (book['id'],))
+                _insert_book(conn, book, position)
+        except sqlite3.Error as e:
+            print(f"Ошибка сохранения книги {book['id']}: {e}")
+            return False
+        return True
+
+    def delete_book(self, book_id: int, books: list) -> bool:
+        try:
+            with self.database.transaction() as conn:
+                conn.execute('DELETE FROM books WHERE id = ?', (book_id,))
+        except sqlite3.Error as e:
+            print(f"Ошибка удаления книги {book_id}: {e}")
+            return False
+        return True
+
+
+def migrate_from_json(database: SQLiteDatabase, users: dict, books: list):
+    """Переносит данные users.json и books.json в базу, заменяя ее содержимое"""
+    with database.transaction() as conn:
+        conn.execute('DELETE FROM users')
+        conn.execute('DELETE FROM books')
+        for username, data in users.items():
+            _write_user(conn, username, data)
+        for position, book in enumerate(books):
+            _insert_book(conn, book, position)
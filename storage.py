@@ -0,0 +1,118 @@
+import json
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+
+from tracing import span
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+def _current_umask():
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+_UMASK = _current_umask()
+
+
+def create_file_if_not_exists(filename, default_data):
+    """Создает файл если он не существует"""
+    if not os.path.exists(filename):
+        atomic_write(filename, default_data)
+        print(f"Создан файл: {filename}")
+    return True
+
+def load_data(filename):
+    """Загружает данные из JSON файла"""
+    try:
+        if os.path.exists(filename):
+            with span('storage'), open(filename, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return None
+    except Exception as e:
+        print(f"Ошибка загрузки {filename}: {e}")
+        return None
+
+def _fsync_directory(directory):
+    """Сбрасывает на диск запись каталога, чтобы переименование пережило сбой питания"""
+    if not hasattr(os, 'O_DIRECTORY'):
+        # Windows не позволяет открыть каталог для fsync
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def atomic_write(filename, data, fsync_dir=True):
+    """Атомарно записывает data в JSON файл.
+
+    Данные пишутся во временный файл в том же каталоге, сбрасываются на
+    диск и подменяют целевой файл через os.replace. Читатели всегда
+    видят либо старую, либо новую версию файла целиком.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(filename)}.',
+                                    suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(tmp_path, stat.S_IMODE(os.stat(filename).st_mode))
+        except FileNotFoundError:
+            os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, filename)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    if fsync_dir:
+        _fsync_directory(directory)
+
+def save_data(filename, data, fsync_dir=True):
+    """Сохраняет данные в JSON файл (атомарно, см. atomic_write)"""
+    try:
+        with span('storage'):
+            atomic_write(filename, data, fsync_dir=fsync_dir)
+        return True
+    except Exception as e:
+        print(f"Ошибка сохранения {filename}: {e}")
+        return False
+
+def file_signature(filename):
+    """Возвращает (inode, mtime, размер) файла или None, если файла нет.
+
+    inode меняется при каждой атомарной записи через os.replace, поэтому
+    подмена файла другим процессом замечается даже при совпадении mtime.
+    """
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+@contextmanager
+def file_lock(path, shared=False):
+    """Межпроцессная блокировка через flock на отдельном файле.
+
+    На платформах без fcntl блокировка ничего не делает: там приложение
+    запускается в одном процессе.
+    """
+    if fcntl is None:
+        yield
+        return
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666 & ~_UMASK)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
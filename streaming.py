@@ -0,0 +1,41 @@
+from flask import g, get_flashed_messages, stream_template
+from markupsafe import Markup
+
+
+# Отметка в потоке шаблона: все, что накопилось до нее, уходит клиенту
+FLUSH_MARKER = '<!-- stream-flush -->'
+
+
+def stream_flush():
+    """Глобальная функция шаблонов: в потоковом режиме отправляет накопленный HTML.
+
+    При обычной отрисовке возвращает пустую строку.
+    """
+    if g.get('streaming'):
+        return Markup(FLUSH_MARKER)
+    return ''
+
+
+def _chunks(stream):
+    buffer = []
+    for piece in stream:
+        if piece == FLUSH_MARKER:
+            if buffer:
+                yield ''.join(buffer)
+                buffer = []
+        else:
+            buffer.append(piece)
+    if buffer:
+        yield ''.join(buffer)
+
+
+def render_stream(template_name: str, **context):
+    """Отрисовывает шаблон потоком, частями между вызовами stream_flush().
+
+    Сессия сохраняется до того, как начнет выполняться шаблон, поэтому
+    flash-сообщения забираются из нее заранее: base.html получит их из
+    контекста запроса, а сессия не покажет их повторно.
+    """
+    get_flashed_messages()
+    g.streaming = True
+    return _chunks(stream_template(template_name, **context))
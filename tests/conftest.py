@@ -0,0 +1,29 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope='session')
+def library(tmp_path_factory):
+    """Модуль app, загруженный из копии books.json и users.json во временном каталоге.
+
+    app.py читает данные и настройки при импорте, поэтому модуль один на
+    все тесты. Сессии хранятся в памяти процесса.
+    """
+    directory = tmp_path_factory.mktemp('library')
+    for name in ('books.json', 'users.json'):
+        shutil.copy(os.path.join(ROOT, name), directory)
+    os.environ['LIBRARY_SESSION_BACKEND'] = 'memory'
+    os.environ['LIBRARY_SLOW_REQUEST_THRESHOLD'] = 'null'
+    previous = os.getcwd()
+    os.chdir(directory)
+    import app
+    yield app
+    app.password_hasher.shutdown()
+    os.chdir(previous)
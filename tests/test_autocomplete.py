@@ -0,0 +1,83 @@
+import json
+import os
+
+import pytest
+
+from autocomplete import AutocompleteIndex
+from conftest import ROOT
+
+
+class Catalog:
+    """Минимальный каталог для attach(): список книг и подписчики"""
+
+    def __init__(self, books):
+        self.books = list(books)
+        self.listeners = []
+
+    def __iter__(self):
+        return iter(self.books)
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def remove(self, book_id):
+        book = next(book for book in self.books if book['id'] == book_id)
+        self.books.remove(book)
+        for listener in self.listeners:
+            listener('remove', book)
+
+
+@pytest.fixture
+def books():
+    with open(os.path.join(ROOT, 'books.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def tops(node, prefix=''):
+    """Списки лучших книг всех узлов дерева: префикс → [book_id]"""
+    result = {prefix: [book_id for _, _, book_id in node.top]}
+    for char, child in node.children.items():
+        result.update(tops(child, prefix + char))
+    return result
+
+
+def assert_same_as_rebuilt(index, catalog):
+    rebuilt = AutocompleteIndex()
+    rebuilt.attach(Catalog(catalog))
+    assert tops(index._root) == tops(rebuilt._root)
+
+
+def test_remove_book_with_token_prefix_of_another(books):
+    # «в» - префикс «все» (ё заменяется на е) в названии «Всё лето в один день»
+    book = next(book for book in books if book['id'] == 33)
+    assert {'в', 'все'} <= set(AutocompleteIndex._book_weights(book))
+
+    catalog = Catalog(books)
+    index = AutocompleteIndex()
+    index.attach(catalog)
+    catalog.remove(33)
+
+    assert 33 not in index.suggest('в', limit=20)
+    assert 33 not in index._order
+    assert_same_as_rebuilt(index, catalog)
+
+
+def test_remove_every_book(books):
+    catalog = Catalog(books)
+    index = AutocompleteIndex()
+    index.attach(catalog)
+    for book in list(books):
+        catalog.remove(book['id'])
+    assert not index._root.children
+    assert index._root.size == 0
+
+
+def test_update_keeps_order(books):
+    catalog = Catalog(books)
+    index = AutocompleteIndex()
+    index.attach(catalog)
+    book = dict(next(book for book in books if book['id'] == 33), title='Всё вечное лето')
+    index.add_book(book)
+    assert index.suggest('вечное') == [33]
+    catalog.books = [book if item['id'] == 33 else item for item in catalog.books]
+    assert_same_as_rebuilt(index, catalog)
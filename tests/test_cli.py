@@ -0,0 +1,42 @@
+from click.testing import CliRunner
+
+from flask import Flask
+from flask.cli import ScriptInfo, compile_templates_command
+
+
+def make_app(tmp_path, templates):
+    folder = tmp_path / 'templates'
+    folder.mkdir()
+    for name, content in templates.items():
+        (folder / name).write_bytes(content)
+    app = Flask(__name__, template_folder=str(folder))
+    app.config['TEMPLATES_BYTECODE_CACHE'] = str(tmp_path / 'cache')
+    return app
+
+
+def run(app):
+    return CliRunner().invoke(
+        compile_templates_command, obj=ScriptInfo(create_app=lambda: app))
+
+
+def test_compiles_all_templates(tmp_path):
+    app = make_app(tmp_path, {'a.html': b'{{ 1 }}', 'b.html': b'{% extends "a.html" %}'})
+    result = run(app)
+    assert result.exit_code == 0, result.output
+    assert 'Compiled 2 of 2 templates.' in result.output
+
+
+def test_reports_every_broken_template(tmp_path):
+    app = make_app(tmp_path, {
+        'a_syntax.html': b'{% if %}',
+        'b_filter.html': b'{{ 1 | no_such_filter }}',
+        'c_encoding.html': b'\xff\xfe',
+        'd_ok.html': b'ok',
+    })
+    result = run(app)
+    assert result.exit_code == 1
+    assert 'a_syntax.html:1:' in result.stderr
+    assert "b_filter.html:1: No filter named 'no_such_filter'" in result.stderr
+    assert 'c_encoding.html: UnicodeDecodeError' in result.stderr
+    assert 'Compiled 1 of 4 templates.' in result.output
+    assert '3 of 4 templates failed to compile.' in result.stderr
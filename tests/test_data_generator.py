@@ -0,0 +1,33 @@
+import json
+
+from data_generator import generate_dataset, write_json, write_sqlite
+from sqlite_storage import SQLiteDatabase, SQLiteUserRepository
+
+
+def test_same_seed_same_data():
+    assert generate_dataset(20, 10, seed=1) == generate_dataset(20, 10, seed=1)
+
+
+def test_write_json(tmp_path):
+    books, users = generate_dataset(20, 10)
+    assert write_json(books, users, str(tmp_path / 'books.json'), str(tmp_path / 'users.json'))
+    assert json.loads((tmp_path / 'books.json').read_text(encoding='utf-8')) == books
+
+
+def test_write_json_reports_failure(tmp_path):
+    books, users = generate_dataset(20, 10)
+    (tmp_path / 'books.json').mkdir()
+    assert not write_json(books, users, str(tmp_path / 'books.json'), str(tmp_path / 'users.json'))
+
+
+def test_write_sqlite(tmp_path):
+    books, users = generate_dataset(20, 10)
+    path = str(tmp_path / 'library.db')
+    assert write_sqlite(books, users, path)
+    assert len(SQLiteUserRepository(SQLiteDatabase(path))) == len(users)
+
+
+def test_write_sqlite_reports_failure(tmp_path):
+    books, users = generate_dataset(20, 10)
+    (tmp_path / 'library.db').mkdir()
+    assert not write_sqlite(books, users, str(tmp_path / 'library.db'))
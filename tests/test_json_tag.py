@@ -0,0 +1,81 @@
+from datetime import datetime
+from datetime import timezone
+from uuid import uuid4
+
+import pytest
+from markupsafe import Markup
+
+from flask.json.tag import JSONTag
+from flask.json.tag import TaggedJSONSerializer
+
+
+VALUES = [
+    {'_permanent': True, 'user': {'username': 'ivanov', 'grade': '9'}},
+    {'_flashes': [('success', 'Книга добавлена в избранное!'), ('error', 'Ошибка')]},
+    ('a', 1, None),
+    (('вложенный', ('кортеж',)), [1, (2, 3)]),
+    [(), []],
+    b'\xff\x00bytes',
+    {'data': b'bytes'},
+    Markup('<b>жирный</b>'),
+    {'_flashes': [('info', Markup('<i>ссылка</i>'))]},
+    {' t': 'a'},
+    {' di': {' t': ['x']}},
+    {'nested': {' m': 'not markup'}},
+    datetime(2026, 10, 18, 12, 30, tzinfo=timezone.utc),
+    {'at': datetime(2026, 10, 18, tzinfo=timezone.utc)},
+    uuid4(),
+    {'список': [1, 2.5, 'три', None, True, {'ключ': [False]}]},
+    {1: 'int key'},
+    '',
+    0,
+]
+
+
+@pytest.mark.parametrize('fast_path', [True, False])
+@pytest.mark.parametrize('value', VALUES)
+def test_round_trip(value, fast_path):
+    serializer = TaggedJSONSerializer(fast_path=fast_path)
+    data = serializer.loads(serializer.dumps(value))
+    if isinstance(value, dict) and 1 in value:
+        # JSON хранит ключи объектов строками
+        value = {'1': 'int key'}
+    assert data == value
+    assert type(data) is type(value)
+
+
+@pytest.mark.parametrize('value', VALUES)
+def test_fast_path_output_is_the_same(value):
+    fast = TaggedJSONSerializer()
+    slow = TaggedJSONSerializer(fast_path=False)
+    data = slow.dumps(value)
+    assert fast.dumps(value) == data
+    assert fast.loads(data) == slow.loads(data)
+
+
+def test_flashes_stay_tuples():
+    serializer = TaggedJSONSerializer()
+    data = serializer.loads(serializer.dumps({'_flashes': [('success', 'ok')]}))
+    assert data['_flashes'] == [('success', 'ok')]
+    assert type(data['_flashes'][0]) is tuple
+
+
+def test_custom_tag_disables_fast_path():
+    class TagUpper(JSONTag):
+        __slots__ = ()
+        key = ' up'
+
+        def check(self, value):
+            return isinstance(value, str) and value.isupper()
+
+        def to_json(self, value):
+            return value.lower()
+
+        def to_python(self, value):
+            return value.upper()
+
+    serializer = TaggedJSONSerializer()
+    serializer.register(TagUpper, index=0)
+    data = serializer.dumps({'key': 'ABC'})
+    assert data == '{"key":{" up":"abc"}}'
+    assert serializer.loads(data) == {'key': 'ABC'}
@@ -0,0 +1,87 @@
+import base64
+
+import pytest
+
+from pagination import decode_cursor, encode_cursor, paginate
+
+
+def raw_cursor(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+IDS = list(range(1, 101))
+RANK = {book_id: position for position, book_id in enumerate(IDS)}
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(24, 24)) == (24, 24)
+    assert decode_cursor(encode_cursor(0, None)) == (0, None)
+
+
+@pytest.mark.parametrize('payload', [
+    '{"o":0,"a":[1]}',
+    '{"o":0,"a":{"x":1}}',
+    '{"o":0,"a":"1"}',
+    '{"o":0,"a":true}',
+    '{"o":1e400}',
+    '{"o":1.5}',
+    '{"o":true}',
+    '{"o":-1}',
+    '{"o":"1"}',
+    '[0, 1]',
+    '"o"',
+])
+def test_invalid_cursor_payload(payload):
+    assert decode_cursor(raw_cursor(payload)) is None
+
+
+@pytest.mark.parametrize('cursor', ['', '!!!', 'не курсор', raw_cursor('not json')])
+def test_garbage_cursor(cursor):
+    assert decode_cursor(cursor) is None
+
+
+@pytest.mark.parametrize('payload', ['{"o":0,"a":[1]}', '{"o":1e400}'])
+@pytest.mark.parametrize('rank', [RANK, None])
+def test_bad_cursor_falls_back_to_first_page(payload, rank):
+    page = paginate(IDS, limit=10, cursor=raw_cursor(payload), rank=rank)
+    assert page.ids == IDS[:10]
+
+
+def test_cursor_follows_book():
+    cursor = paginate(IDS, limit=10).next_cursor
+    # Перед книгой курсора удалили две книги
+    ids = IDS[2:]
+    rank = {book_id: position for position, book_id in enumerate(ids)}
+    assert paginate(ids, limit=10, cursor=cursor, rank=rank).ids == IDS[10:20]
+    assert paginate(ids, limit=10, cursor=cursor).ids == IDS[10:20]
+
+
+@pytest.mark.parametrize('page', [11, 1000])
+def test_page_past_the_end_shows_last_page(page):
+    pagination = paginate(IDS, page=page, limit=10)
+    assert pagination.ids == IDS[90:]
+    assert pagination.page == pagination.pages == 10
+    assert pagination.has_prev and not pagination.has_next
+
+
+def test_page_past_the_end_of_partial_last_page():
+    pagination = paginate(IDS[:95], page=50, limit=10)
+    assert pagination.ids == IDS[90:95]
+    assert pagination.page == 10
+
+
+def test_cursor_past_the_end_shows_last_page():
+    pagination = paginate(IDS[:50], limit=10, cursor=encode_cursor(70, None))
+    assert pagination.ids == IDS[40:50]
+
+
+def test_empty_list():
+    pagination = paginate([], page=3, limit=10)
+    assert pagination.ids == []
+    assert pagination.page == pagination.pages == 1
+
+
+def test_catalog_page_past_the_end(library):
+    html = library.app.test_client().get('/catalog?page=999').get_data(as_text=True)
+    assert 'Найдено книг' in html
+    assert 'Книги не найдены' not in html
@@ -0,0 +1,58 @@
+from collections import Counter
+
+import pytest
+
+from profiler import MIN_INTERVAL, SamplingProfiler
+
+
+@pytest.fixture
+def admin(library):
+    client = library.app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    return client
+
+
+@pytest.mark.parametrize('query', [
+    {'interval': '-1'},
+    {'interval': '0'},
+    {'interval': 'nan'},
+    {'interval': 'inf'},
+    {'interval': 'быстро'},
+    {'seconds': '-5'},
+    {'seconds': '0'},
+    {'seconds': 'nan'},
+    {'seconds': 'inf'},
+    {'seconds': ''},
+])
+def test_bad_parameters(admin, query):
+    response = admin.get('/admin/profile', query_string=query)
+    assert response.status_code == 400
+
+
+def test_parameters_are_clamped(admin, monkeypatch, library):
+    calls = []
+
+    def profile(seconds, interval=None, all_threads=False):
+        calls.append((seconds, interval))
+        return Counter()
+
+    monkeypatch.setattr(library.sampling_profiler, 'profile', profile)
+    assert admin.get('/admin/profile', query_string={'seconds': 1e9, 'interval': 1e-9}).status_code == 200
+    assert admin.get('/admin/profile', query_string={'seconds': 0.001, 'interval': 5}).status_code == 200
+    assert admin.get('/admin/profile').status_code == 200
+    assert calls == [
+        (library.app.config['PROFILER_MAX_SECONDS'], MIN_INTERVAL),
+        (0.1, 0.1),
+        (10.0, library.app.config['PROFILER_INTERVAL']),
+    ]
+
+
+def test_guest_is_forbidden(library):
+    assert library.app.test_client().get('/admin/profile?interval=-1').status_code == 403
+
+
+def test_profile_rejects_short_interval():
+    profiler = SamplingProfiler()
+    with pytest.raises(ValueError):
+        profiler.profile(0.01, interval=0)
+    assert profiler.profile(0.01, interval=0.002) is not None
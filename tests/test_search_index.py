@@ -0,0 +1,75 @@
+import json
+import os
+
+import pytest
+
+from catalog_store import CatalogStore
+from conftest import ROOT
+from search_index import SearchIndex
+
+
+class MemoryStorage:
+    """Хранилище каталога, которое ничего не записывает"""
+
+    def save_all(self, books):
+        return True
+
+    def save_book(self, book, books):
+        return True
+
+    def delete_book(self, book_id, books):
+        return True
+
+
+QUERIES = ['война', 'войну и мир', 'толс', 'о', 'в с', 'лето день', 'брэдбери все']
+
+
+@pytest.fixture
+def catalog():
+    with open(os.path.join(ROOT, 'books.json'), encoding='utf-8') as f:
+        store = CatalogStore(MemoryStorage(), json.load(f))
+    index = SearchIndex()
+    index.attach(store)
+    # Упорядоченные постинги считаются лениво, поэтому сначала их заполняем
+    for query in QUERIES:
+        index.search(query, limit=5)
+    return store, index
+
+
+def assert_same_as_rebuilt(store, index):
+    rebuilt = SearchIndex()
+    rebuilt.attach(CatalogStore(MemoryStorage(), list(store)))
+    for query in QUERIES:
+        assert index.search(query) == rebuilt.search(query)
+        assert index.search(query, limit=5) == rebuilt.search(query, limit=5)
+
+
+def test_multi_word_query_needs_every_word(catalog):
+    store, index = catalog
+    found = index.search('лето день')
+    assert 33 in found
+    assert set(found) == set(index.search('лето')) & set(index.search('день'))
+
+
+def test_remove_keeps_positions_of_other_books(catalog):
+    store, index = catalog
+    ids = [book['id'] for book in store]
+    positions = {book_id: store.position(book_id) for book_id in ids}
+    store.remove(ids[0])
+    store.remove(ids[len(ids) // 2])
+    assert store.position(ids[0]) is None
+    assert all(store.position(book_id) == positions[book_id]
+               for book_id in ids if store.get(book_id) is not None)
+    assert [book['id'] for book in store] == [book_id for book_id in ids if book_id in store]
+    assert_same_as_rebuilt(store, index)
+
+
+def test_mutations_update_ranked_postings(catalog):
+    store, index = catalog
+    ids = [book['id'] for book in store]
+    store.update(ids[5], title='Война и лето')
+    store.remove(ids[1])
+    store.add({'id': max(ids) + 1, 'title': 'Войну не видели', 'author': 'Л. Толстой',
+               'description': 'Один день лета'})
+    store.update(ids[-1], description='')
+    assert_same_as_rebuilt(store, index)
@@ -0,0 +1,72 @@
+from flask import Flask, session
+from flask.sessions import MemorySessionStore, ServerSideSessionInterface
+
+
+def login(client, username='admin', password='admin123'):
+    return client.post('/login', data={'username': username, 'password': password})
+
+
+def test_login_issues_new_session_id(library):
+    attacker = library.app.test_client()
+    # Гость получает id сессии вместе с flash-сообщением
+    attacker.get('/profile')
+    fixed_sid = attacker.get_cookie('session').value
+
+    victim = library.app.test_client()
+    victim.set_cookie('session', fixed_sid)
+    login(victim)
+    assert victim.get_cookie('session').value != fixed_sid
+    assert victim.get('/profile').status_code == 200
+    # Известный до входа id не дает доступа к аккаунту
+    assert attacker.get('/profile').status_code == 302
+
+
+def test_logout_issues_new_session_id(library):
+    client = library.app.test_client()
+    login(client)
+    logged_in_sid = client.get_cookie('session').value
+    client.get('/logout')
+    assert client.get_cookie('session').value != logged_in_sid
+
+    stolen = library.app.test_client()
+    stolen.set_cookie('session', logged_in_sid)
+    assert stolen.get('/profile').status_code == 302
+
+
+def test_regenerate_deletes_old_store_entry():
+    store = MemorySessionStore()
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.session_interface = ServerSideSessionInterface(store)
+
+    @app.route('/set')
+    def set_value():
+        session['value'] = 1
+        return ''
+
+    @app.route('/regenerate')
+    def regenerate():
+        app.session_interface.regenerate(session)
+        return ''
+
+    client = app.test_client()
+    client.get('/set')
+    old_sid = client.get_cookie('session').value
+    client.get('/regenerate')
+    new_sid = client.get_cookie('session').value
+    assert new_sid != old_sid
+    assert store.get(old_sid) is None
+    assert store.get(new_sid) is not None
+
+
+def test_cookie_session_regenerate_is_noop():
+    app = Flask(__name__)
+    app.secret_key = 'test'
+
+    @app.route('/')
+    def index():
+        session['value'] = 1
+        app.session_interface.regenerate(session)
+        return str(session['value'])
+
+    assert app.test_client().get('/').get_data(as_text=True) == '1'
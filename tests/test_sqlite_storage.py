@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+from sqlite_storage import SQLiteDatabase, SQLiteUserRepository
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'library.db')
+
+
+def in_new_thread(function):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(function()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_write_from_another_process_changes_version_in_new_thread(path):
+    repository = SQLiteUserRepository(SQLiteDatabase(path))
+    repository.create('ivanov', {'email': 'ivanov@example.com', 'favorites': []})
+    before = in_new_thread(lambda: repository.version('ivanov'))
+
+    # Другой процесс: свое соединение и свои версии в памяти
+    other = SQLiteUserRepository(SQLiteDatabase(path))
+    user = other.get('ivanov')
+    user.data['favorites'] = [1]
+    assert other.save(user)
+
+    assert in_new_thread(lambda: repository.version('ivanov')) != before
+    assert repository.get('ivanov').data['favorites'] == [1]
+
+
+def test_own_write_changes_only_its_record(path):
+    repository = SQLiteUserRepository(SQLiteDatabase(path))
+    repository.create('ivanov', {'email': 'ivanov@example.com'})
+    repository.create('petrov', {'email': 'petrov@example.com'})
+    ivanov = repository.version('ivanov')
+    petrov = in_new_thread(lambda: repository.version('petrov'))
+
+    user = repository.get('ivanov')
+    user.data['grade'] = '10'
+    assert in_new_thread(lambda: repository.save(user))
+
+    assert repository.version('ivanov') != ivanov
+    assert in_new_thread(lambda: repository.version('petrov')) == petrov
+
+
+def test_delete_from_another_process(path):
+    repository = SQLiteUserRepository(SQLiteDatabase(path))
+    repository.create('ivanov', {'email': 'ivanov@example.com'})
+    before = repository.version('ivanov')
+    assert SQLiteUserRepository(SQLiteDatabase(path)).delete('ivanov')
+    assert in_new_thread(lambda: repository.version('ivanov')) != before
+    assert repository.get('ivanov') is None
@@ -0,0 +1,36 @@
+import pytest
+
+
+def is_streamed(response):
+    # Тестовый клиент всегда отдает тело итератором; отрисованная целиком
+    # страница отличается заголовком Content-Length
+    return 'Content-Length' not in response.headers
+
+
+@pytest.fixture
+def client(library):
+    library.response_cache.clear()
+    return library.app.test_client()
+
+
+def test_default_catalog_page_is_streamed(client, library):
+    assert library.app.config['CATALOG_PAGE_SIZE'] >= library.app.config['STREAM_MIN_BOOKS']
+    response = client.get('/catalog')
+    assert response.status_code == 200
+    assert is_streamed(response)
+    html = response.get_data(as_text=True)
+    assert 'Найдено книг' in html
+    assert '<!-- stream-flush -->' not in html
+
+
+def test_short_listing_is_rendered_at_once(client):
+    response = client.get('/catalog', query_string={'limit': 5})
+    assert response.status_code == 200
+    assert not is_streamed(response)
+
+
+def test_streamed_page_is_cached_for_guests(client):
+    first = client.get('/catalog').get_data(as_text=True)
+    second = client.get('/catalog')
+    assert not is_streamed(second)
+    assert second.get_data(as_text=True) == first
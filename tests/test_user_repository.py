@@ -0,0 +1,135 @@
+import json
+import os
+import threading
+
+import pytest
+
+from user_repository import EmailTaken, UserRepository
+
+
+@pytest.fixture
+def filename(tmp_path):
+    path = tmp_path / 'users.json'
+    path.write_text(json.dumps({
+        'ivanov': {'email': 'ivanov@example.com', 'favorites': []},
+    }), encoding='utf-8')
+    return str(path)
+
+
+def journal_lines(filename):
+    with open(filename + '.wal', 'rb') as f:
+        return f.read().splitlines(keepends=True)
+
+
+def add_favorite(repository, username, book_id):
+    user = repository.get(username)
+    user.add_favorite(book_id)
+    assert repository.save(user)
+
+
+def test_journal_replay_across_instances(filename):
+    first = UserRepository(filename, journal=True)
+    second = UserRepository(filename, journal=True)
+    version = second.version('ivanov')
+    with open(filename, encoding='utf-8') as f:
+        snapshot = f.read()
+
+    add_favorite(first, 'ivanov', 1)
+    first.create('petrov', {'email': 'petrov@example.com'})
+
+    # Изменения ушли в журнал, снимок не переписывался
+    with open(filename, encoding='utf-8') as f:
+        assert f.read() == snapshot
+    assert len(journal_lines(filename)) == 2
+
+    assert second.get('ivanov').favorites == [1]
+    assert second.version('ivanov') != version
+    assert 'petrov' in second
+    assert second.find_by_email('PETROV@example.com') == 'petrov'
+
+    # Вторая копия дописывает журнал после записей первой
+    add_favorite(second, 'ivanov', 2)
+    assert first.get('ivanov').favorites == [1, 2]
+    assert UserRepository(filename, journal=True).get('ivanov').favorites == [1, 2]
+
+
+def test_torn_tail_is_ignored_and_repaired(filename):
+    repository = UserRepository(filename, journal=True)
+    add_favorite(repository, 'ivanov', 1)
+    # Запись, оборванная сбоем посреди строки
+    with open(filename + '.wal', 'ab') as f:
+        f.write(b'{"op":"put","username":"ivanov","data":{"favo')
+
+    restarted = UserRepository(filename, journal=True)
+    assert restarted.get('ivanov').favorites == [1]
+
+    add_favorite(restarted, 'ivanov', 2)
+    lines = journal_lines(filename)
+    assert len(lines) == 2
+    assert all(line.endswith(b'\n') and json.loads(line) for line in lines)
+    assert UserRepository(filename, journal=True).get('ivanov').favorites == [1, 2]
+
+
+def test_compaction_when_journal_grows(filename):
+    repository = UserRepository(filename, journal=True, journal_max_bytes=300)
+    other = UserRepository(filename, journal=True, journal_max_bytes=300)
+    for book_id in range(1, 6):
+        add_favorite(repository, 'ivanov', book_id)
+        assert os.path.getsize(filename + '.wal') <= 300
+
+    with open(filename, encoding='utf-8') as f:
+        snapshot = json.load(f)
+    assert snapshot['ivanov']['favorites'][:3] == [1, 2, 3]
+    # После сворачивания другая копия перечитывает снимок, а не журнал
+    assert other.get('ivanov').favorites == [1, 2, 3, 4, 5]
+    assert UserRepository(filename, journal=True).get('ivanov').favorites == [1, 2, 3, 4, 5]
+
+
+def test_leftover_journal_is_compacted_without_journal_mode(filename):
+    add_favorite(UserRepository(filename, journal=True), 'ivanov', 1)
+    repository = UserRepository(filename)
+    assert os.path.getsize(filename + '.wal') == 0
+    with open(filename, encoding='utf-8') as f:
+        assert json.load(f)['ivanov']['favorites'] == [1]
+    assert repository.get('ivanov').favorites == [1]
+
+
+@pytest.mark.parametrize('journal', [False, True])
+def test_racing_creates_with_one_email(filename, journal):
+    # Две копии репозитория - как два процесса с одним users.json
+    repositories = [UserRepository(filename, journal=journal) for _ in range(2)]
+    barrier = threading.Barrier(8)
+    results = []
+
+    def register(index):
+        barrier.wait()
+        try:
+            user = repositories[index % 2].create(f'user{index}', {'email': 'Same@Example.com '})
+            results.append(user.username if user else None)
+        except EmailTaken:
+            results.append('taken')
+
+    threads = [threading.Thread(target=register, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    created = [result for result in results if result not in ('taken', None)]
+    assert len(created) == 1
+    assert results.count('taken') == 7
+    fresh = UserRepository(filename, journal=journal)
+    assert fresh.find_by_email('same@example.com') == created[0]
+    assert [name for name in fresh.usernames() if name.startswith('user')] == created
+
+
+def test_create_rejects_taken_email_of_other_instance(filename):
+    first = UserRepository(filename, journal=True)
+    second = UserRepository(filename, journal=True)
+    first.create('petrov', {'email': 'petrov@example.com'})
+    with pytest.raises(EmailTaken):
+        second.create('sidorov', {'email': 'PETROV@example.com'})
+    user = second.get('ivanov')
+    user.email = 'petrov@example.com'
+    with pytest.raises(EmailTaken):
+        second.save(user)
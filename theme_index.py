@@ -0,0 +1,82 @@
+import threading
+
+from catalog_store import CatalogIndex
+from search_index import normalize
+
+
+class ThemeIndex(CatalogIndex):
+    """Индекс тем каталога: тема → множество id книг.
+
+    Строится один раз по каталогу и обновляется по событиям
+    CatalogStore. Отсортированный список тем и счетчики книг по темам
+    хранятся готовыми, а фильтрация и фасеты сводятся к пересечению
+    множеств без повторного просмотра книг.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._books = {}
+        self._book_themes = {}
+        self._normalized = {}
+        self._sorted_themes = None
+        self._store = None
+
+    def rebuild(self):
+        with self._lock:
+            self._books = {}
+            self._book_themes = {}
+            self._normalized = {}
+            self._sorted_themes = None
+            for book in self._store:
+                self.add_book(book)
+
+    def add_book(self, book: dict):
+        """Добавляет книгу (повторный вызов обновляет ее темы)"""
+        with self._lock:
+            themes = frozenset(book.get('theme', ()))
+            if self._book_themes.get(book['id']) == themes:
+                return
+            self.remove_book(book['id'])
+            self._book_themes[book['id']] = themes
+            for theme in themes:
+                if theme not in self._books:
+                    self._books[theme] = set()
+                    self._normalized[theme] = normalize(theme)
+                    self._sorted_themes = None
+                self._books[theme].add(book['id'])
+
+    def remove_book(self, book_id: int):
+        with self._lock:
+            for theme in self._book_themes.pop(book_id, ()):
+                books = self._books[theme]
+                books.discard(book_id)
+                if not books:
+                    del self._books[theme]
+                    del self._normalized[theme]
+                    self._sorted_themes = None
+
+    def themes(self) -> list:
+        """Все темы каталога по алфавиту"""
+        with self._lock:
+            if self._sorted_themes is None:
+                self._sorted_themes = sorted(self._books)
+            return self._sorted_themes
+
+    def books_for(self, query: str) -> set:
+        """id книг, у которых есть тема, содержащая query (без учета регистра)"""
+        query = normalize(query)
+        with self._lock:
+            matched = [books for theme, books in self._books.items()
+                       if query in self._normalized[theme]]
+            if len(matched) == 1:
+                return set(matched[0])
+            return set().union(*matched)
+
+    def counts(self, book_ids=None) -> dict:
+        """Число книг по каждой теме, среди book_ids если они заданы"""
+        with self._lock:
+            if book_ids is None:
+                return {theme: len(books) for theme, books in self._books.items()}
+            if not isinstance(book_ids, (set, frozenset)):
+                book_ids = set(book_ids)
+            return {theme: len(books & book_ids) for theme, books in self._books.items()}
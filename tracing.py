@@ -0,0 +1,177 @@
+import json
+import time
+from contextvars import ContextVar
+
+from flask import request
+from flask.signals import before_render_template, template_rendered
+
+
+# Трассировка текущего запроса; вне запроса (CLI, пул хеширования) - None
+_current_trace = ContextVar('library_trace', default=None)
+
+
+class Trace:
+    """Время этапов одного запроса: имя этапа → [секунды, число вызовов]"""
+
+    __slots__ = ('started', 'spans', 'status', '_render_stack')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = {}
+        self.status = None
+        self._render_stack = []
+
+    def add(self, name: str, seconds: float):
+        entry = self.spans.get(name)
+        if entry is None:
+            self.spans[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """Значение заголовка Server-Timing, длительности в миллисекундах"""
+        parts = [f'{name};dur={seconds * 1000:.2f}' for name, (seconds, _) in self.spans.items()]
+        parts.append(f'total;dur={self.elapsed() * 1000:.2f}')
+        return ', '.join(parts)
+
+
+def current_trace():
+    """Трассировка текущего запроса или None"""
+    return _current_trace.get()
+
+
+class span:
+    """Контекстный менеджер, который добавляет время блока к этапу name.
+
+        with span('storage'):
+            data = load_data(filename)
+
+    Вне запроса ничего не делает. Повторные блоки с тем же именем
+    складываются, поэтому вложенные блоки одного этапа лучше не
+    делать - их время посчитается дважды.
+    """
+
+    __slots__ = ('name', '_trace', '_started')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self._trace = _current_trace.get()
+        if self._trace is not None:
+            self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._trace is not None:
+            self._trace.add(self.name, time.perf_counter() - self._started)
+        return False
+
+
+class TracedSessionInterface:
+    """Обертка интерфейса сессий: замеряет save_session и ставит Server-Timing.
+
+    Flask сохраняет сессию после всех after_request, поэтому заголовок
+    с полным списком этапов можно поставить только здесь.
+    """
+
+    def __init__(self, interface, server_timing: bool = True):
+        self.interface = interface
+        self.server_timing = server_timing
+
+    def __getattr__(self, name):
+        return getattr(self.interface, name)
+
+    def open_session(self, app, request):
+        return self.interface.open_session(app, request)
+
+    def make_null_session(self, app):
+        return self.interface.make_null_session(app)
+
+    def is_null_session(self, obj) -> bool:
+        return self.interface.is_null_session(obj)
+
+    def save_session(self, app, session, response):
+        with span('session'):
+            self.interface.save_session(app, session, response)
+        trace = _current_trace.get()
+        if self.server_timing and trace is not None:
+            response.headers['Server-Timing'] = trace.server_timing()
+
+
+class RequestTracer:
+    """Этапы запросов: Server-Timing и журнал медленных запросов.
+
+    Этапы отмечаются блоками span(); время отрисовки шаблонов берется из
+    сигналов before_render_template и template_rendered, время
+    сохранения сессии - из обертки app.session_interface. Поэтому
+    init_app вызывается после того, как выбран интерфейс сессий.
+
+    Запрос, который шел дольше threshold секунд (None или 0 - журнал
+    выключен), записывается одной строкой JSON. Для потоковых ответов
+    заголовок содержит только этапы до отправки первого байта, а строка
+    журнала пишется в конце потока и учитывает всю отрисовку.
+    """
+
+    def __init__(self, threshold: float = None, server_timing: bool = True):
+        self.threshold = threshold
+        self.server_timing = server_timing
+
+    def init_app(self, app):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.session_interface = TracedSessionInterface(app.session_interface, self.server_timing)
+        before_render_template.connect(self._render_started, app, weak=False)
+        template_rendered.connect(self._render_finished, app, weak=False)
+
+    def _before_request(self):
+        _current_trace.set(Trace())
+
+    def _after_request(self, response):
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.status = response.status_code
+        return response
+
+    def _teardown_request(self, exc):
+        trace = _current_trace.get()
+        if trace is None:
+            return
+        _current_trace.set(None)
+        elapsed = trace.elapsed()
+        if self.threshold and elapsed >= self.threshold:
+            self.log_slow_request(trace, elapsed, 500 if exc is not None else trace.status)
+
+    def log_slow_request(self, trace: Trace, elapsed: float, status):
+        record = {
+            'event': 'slow_request',
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': status,
+            'duration_ms': round(elapsed * 1000, 2),
+            'spans': {name: {'ms': round(seconds * 1000, 2), 'count': count}
+                      for name, (seconds, count) in trace.spans.items()},
+        }
+        print(json.dumps(record, ensure_ascii=False), flush=True)
+
+    @staticmethod
+    def _render_started(app, template, context, **extra):
+        trace = _current_trace.get()
+        if trace is not None:
+            trace._render_stack.append(time.perf_counter())
+
+    @staticmethod
+    def _render_finished(app, template, context, **extra):
+        trace = _current_trace.get()
+        if trace is None or not trace._render_stack:
+            return
+        started = trace._render_stack.pop()
+        # Шаблон, отрисованный внутри другого, уже входит во время внешнего
+        if not trace._render_stack:
+            trace.add('render', time.perf_counter() - started)
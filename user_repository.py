@@ -0,0 +1,396 @@
+import copy
+import threading
+
+from journal import Journal
+from storage import file_lock, file_signature, load_data, save_data
+from versions import VersionCounter
+
+
+class EmailTaken(Exception):
+    """Email уже принадлежит другому пользователю"""
+
+
+def normalize_email(email: str) -> str:
+    """Email для сравнения: без пробелов по краям и без учета регистра"""
+    return (email or '').strip().casefold()
+
+
+def default_notifications():
+    """Настройки уведомлений нового пользователя"""
+    return {
+        'new_books': True,
+        'return_reminders': True,
+        'recommendations': False
+    }
+
+
+class User:
+    """Запись пользователя с типизированным доступом к полям users.json"""
+
+    __slots__ = ('username', 'data')
+
+    def __init__(self, username: str, data: dict):
+        self.username = username
+        self.data = data
+
+    @property
+    def email(self) -> str:
+        return self.data.get('email', '')
+
+    @email.setter
+    def email(self, value: str):
+        self.data['email'] = value
+
+    @property
+    def password_hash(self) -> str:
+        return self.data.get('password', '')
+
+    @password_hash.setter
+    def password_hash(self, value: str):
+        self.data['password'] = value
+
+    @property
+    def full_name(self) -> str:
+        return self.data.get('full_name', '')
+
+    @full_name.setter
+    def full_name(self, value: str):
+        self.data['full_name'] = value
+
+    @property
+    def grade(self) -> str:
+        return self.data.get('grade', '')
+
+    @property
+    def registered_at(self) -> str:
+        return self.data.get('registered_at', '')
+
+    @property
+    def favorites(self) -> list:
+        return self.data.setdefault('favorites', [])
+
+    @property
+    def reading_books(self) -> list:
+        return self.data.setdefault('reading_books', [])
+
+    @property
+    def reading_dates(self) -> dict:
+        return self.data.setdefault('reading_dates', {})
+
+    @property
+    def reading_history(self) -> list:
+        return self.data.setdefault('reading_history', [])
+
+    @property
+    def history_dates(self) -> dict:
+        return self.data.setdefault('history_dates', {})
+
+    @property
+    def notifications(self) -> dict:
+        return self.data.setdefault('notifications', default_notifications())
+
+    @notifications.setter
+    def notifications(self, value: dict):
+        self.data['notifications'] = value
+
+    @property
+    def is_admin(self) -> bool:
+        return self.username == 'admin'
+
+    def session_info(self) -> dict:
+        """Данные пользователя, которые хранятся в сессии"""
+        return {
+            'username': self.username,
+            'full_name': self.full_name,
+            'grade': self.grade
+        }
+
+    def is_favorite(self, book_id: int) -> bool:
+        return book_id in self.favorites
+
+    def is_reading(self, book_id: int) -> bool:
+        return book_id in self.reading_books
+
+    def add_favorite(self, book_id: int) -> bool:
+        """Добавляет книгу в избранное, возвращает False если она уже там"""
+        if book_id in self.favorites:
+            return False
+        self.favorites.append(book_id)
+        return True
+
+    def remove_favorite(self, book_id: int) -> bool:
+        """Удаляет книгу из избранного, возвращает False если ее там не было"""
+        if book_id not in self.favorites:
+            return False
+        self.favorites.remove(book_id)
+        return True
+
+    def start_reading(self, book_id: int, when: str):
+        """Отмечает книгу как читаемую"""
+        self.reading_books.append(book_id)
+        self.reading_dates[str(book_id)] = when
+
+    def finish_reading(self, book_id: int, when: str):
+        """Переносит книгу из читаемых в историю чтения"""
+        self.reading_books.remove(book_id)
+        self.history_dates[str(book_id)] = when
+        if book_id not in self.reading_history:
+            self.reading_history.append(book_id)
+        self.reading_dates.pop(str(book_id), None)
+
+    def clear_history(self):
+        self.data['reading_history'] = []
+        self.data['history_dates'] = {}
+
+    def to_dict(self) -> dict:
+        return copy.deepcopy(self.data)
+
+
+class UserRepository:
+    """Пользователи в памяти процесса.
+
+    Чтение не обращается к диску: файл перечитывается только если
+    изменились его mtime или размер (например, его записал другой
+    процесс). Каждый get() возвращает копию записи, поэтому изменения
+    попадают в хранилище только через save().
+
+    В режиме журнала (journal=True) изменение дописывает одну строку в
+    users.json.wal вместо перезаписи всего users.json. При загрузке
+    журнал проигрывается поверх снимка, а когда он вырастает больше
+    journal_max_bytes, записи сворачиваются в новый снимок.
+
+    version(username) возвращает версию записи пользователя, которая
+    меняется при каждом ее изменении, в том числе другим процессом.
+
+    Индекс email → имя пользователя (без учета регистра) обновляется
+    вместе с записями. create() и save() проверяют по нему уникальность
+    email под той же блокировкой, под которой пишут, и выбрасывают
+    EmailTaken, если адрес занят. Если в старых данных один email у
+    нескольких пользователей, владельцем считается первый из них.
+    """
+
+    def __init__(self, filename: str, journal: bool = False,
+                 journal_max_bytes: int = 1024 * 1024):
+        self.filename = filename
+        self.journal_enabled = journal
+        self.journal_max_bytes = journal_max_bytes
+        self.journal = Journal(filename + '.wal')
+        self._lock_path = filename + '.lock'
+        self._lock = threading.RLock()
+        self._users = {}
+        self._emails = {}
+        self._signature = None
+        self._journal_inode = None
+        self._journal_offset = 0
+        self._versions = VersionCounter()
+        self.reload()
+        # Журнал, оставшийся от прошлого запуска, сворачиваем сразу, если
+        # режим журнала выключен или журнал уже слишком большой
+        if self._journal_offset and (not journal or self._journal_offset > journal_max_bytes):
+            self.compact()
+
+    # Синхронизация с диском. Методы с суффиксом _locked вызываются
+    # под межпроцессной блокировкой file_lock.
+
+    def _load_locked(self):
+        self._signature = file_signature(self.filename)
+        self._users = load_data(self.filename) or {}
+        self._emails = {}
+        for username, data in self._users.items():
+            self._index_email(username, data)
+        self._versions.reset()
+        self._journal_inode = None
+        self._journal_offset = 0
+        self._replay_locked()
+
+    def _replay_locked(self):
+        journal_signature = file_signature(self.journal.path)
+        self._journal_inode = journal_signature[0] if journal_signature else None
+        records, self._journal_offset = self.journal.read(self._journal_offset)
+        for record in records:
+            self._apply(record)
+
+    def _is_stale(self) -> bool:
+        if file_signature(self.filename) != self._signature:
+            return True
+        journal_signature = file_signature(self.journal.path)
+        if journal_signature is None:
+            return self._journal_offset != 0
+        return (journal_signature[0] != self._journal_inode
+                or journal_signature[2] != self._journal_offset)
+
+    def _sync_locked(self):
+        if file_signature(self.filename) != self._signature:
+            self._load_locked()
+            return
+        journal_signature = file_signature(self.journal.path)
+        if journal_signature is None:
+            if self._journal_offset:
+                self._load_locked()
+        elif journal_signature[0] != self._journal_inode or journal_signature[2] < self._journal_offset:
+            self._load_locked()
+        elif journal_signature[2] > self._journal_offset:
+            self._replay_locked()
+
+    def reload(self):
+        """Перечитывает снимок пользователей и журнал с диска"""
+        with self._lock, file_lock(self._lock_path, shared=True):
+            self._load_locked()
+
+    def _refresh(self):
+        if self._is_stale():
+            with file_lock(self._lock_path, shared=True):
+                self._sync_locked()
+
+    def _index_email(self, username: str, data: dict):
+        key = normalize_email(data.get('email'))
+        if key:
+            self._emails.setdefault(key, []).append(username)
+
+    def _unindex_email(self, username: str, data: dict):
+        key = normalize_email(data.get('email'))
+        owners = self._emails.get(key)
+        if owners and username in owners:
+            owners.remove(username)
+            if not owners:
+                del self._emails[key]
+
+    def _apply(self, record: dict):
+        username = record['username']
+        self._versions.bump(username)
+        previous = self._users.get(username)
+        if record['op'] == 'put':
+            data = record['data']
+            self._users[username] = data
+            # Если email не изменился, место в списке владельцев сохраняется
+            if previous is None or normalize_email(previous.get('email')) != normalize_email(data.get('email')):
+                if previous is not None:
+                    self._unindex_email(username, previous)
+                self._index_email(username, data)
+        elif record['op'] == 'delete' and previous is not None:
+            del self._users[username]
+            self._unindex_email(username, previous)
+
+    def _check_email_locked(self, username: str, data: dict):
+        """Выбрасывает EmailTaken, если новый email записи занят другим пользователем"""
+        key = normalize_email(data.get('email'))
+        if not key:
+            return
+        current = self._users.get(username)
+        if current is not None and normalize_email(current.get('email')) == key:
+            return
+        if any(owner != username for owner in self._emails.get(key, ())):
+            raise EmailTaken(data.get('email'))
+
+    def _write_snapshot_locked(self) -> bool:
+        if not save_data(self.filename, self._users):
+            return False
+        self.journal.reset()
+        self._signature = file_signature(self.filename)
+        self._journal_offset = 0
+        return True
+
+    def compact(self) -> bool:
+        """Сворачивает журнал в новый снимок users.json"""
+        with self._lock, file_lock(self._lock_path):
+            self._sync_locked()
+            return self._write_snapshot_locked()
+
+    def _commit_locked(self, record: dict) -> bool:
+        """Применяет изменение и сохраняет его строкой журнала или новым снимком"""
+        username = record['username']
+        previous = self._users.get(username)
+        self._apply(record)
+        if self.journal_enabled:
+            try:
+                # Отрезаем хвост, оставшийся от прерванной записи
+                self.journal.repair(self._journal_offset)
+                self._journal_offset = self.journal.append(record)
+                self._journal_inode = file_signature(self.journal.path)[0]
+                saved = True
+            except OSError as e:
+                print(f"Ошибка записи журнала {self.journal.path}: {e}")
+                saved = False
+            if saved and self._journal_offset > self.journal_max_bytes:
+                self._write_snapshot_locked()
+        else:
+            saved = self._write_snapshot_locked()
+        if not saved:
+            if previous is None:
+                self._apply({'op': 'delete', 'username': username})
+            else:
+                self._apply({'op': 'put', 'username': username, 'data': previous})
+        return saved
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._users)
+
+    def __contains__(self, username: str) -> bool:
+        with self._lock:
+            self._refresh()
+            return username in self._users
+
+    def usernames(self) -> list:
+        with self._lock:
+            self._refresh()
+            return list(self._users)
+
+    def export(self) -> dict:
+        """Возвращает копию всех записей с учетом журнала"""
+        with self._lock:
+            self._refresh()
+            return copy.deepcopy(self._users)
+
+    def get(self, username: str):
+        """Возвращает User или None, если пользователя нет"""
+        with self._lock:
+            self._refresh()
+            data = self._users.get(username)
+            if data is None:
+                return None
+            return User(username, copy.deepcopy(data))
+
+    def version(self, username: str) -> tuple:
+        """Возвращает (номер версии, время изменения) записи пользователя"""
+        with self._lock:
+            self._refresh()
+            return self._versions.get(username)
+
+    def find_by_email(self, email: str):
+        """Возвращает имя пользователя с таким email (без учета регистра) или None"""
+        with self._lock:
+            self._refresh()
+            owners = self._emails.get(normalize_email(email))
+            return owners[0] if owners else None
+
+    def create(self, username: str, data: dict):
+        """Добавляет нового пользователя. Возвращает User или None, если имя занято или запись не сохранилась.
+
+        Выбрасывает EmailTaken, если email уже занят.
+        """
+        with self._lock, file_lock(self._lock_path):
+            self._sync_locked()
+            if username in self._users:
+                return None
+            self._check_email_locked(username, data)
+            data = copy.deepcopy(data)
+            if not self._commit_locked({'op': 'put', 'username': username, 'data': data}):
+                return None
+            return User(username, copy.deepcopy(data))
+
+    def save(self, user: User) -> bool:
+        """Сохраняет изменения пользователя. Выбрасывает EmailTaken, если новый email занят"""
+        with self._lock, file_lock(self._lock_path):
+            self._sync_locked()
+            self._check_email_locked(user.username, user.data)
+            return self._commit_locked({'op': 'put', 'username': user.username, 'data': user.to_dict()})
+
+    def delete(self, username: str) -> bool:
+        """Удаляет пользователя"""
+        with self._lock, file_lock(self._lock_path):
+            self._sync_locked()
+            if username not in self._users:
+                return False
+            return self._commit_locked({'op': 'delete', 'username': username})
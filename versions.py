@@ -0,0 +1,37 @@
+import threading
+import time
+
+
+class VersionCounter:
+    """Номера версий данных для ETag и Last-Modified.
+
+    Каждое изменение записи (ключа) получает следующий номер общего
+    счетчика и время изменения, поэтому номер никогда не повторяется,
+    даже если запись удалили и создали заново. reset() помечает
+    изменившимися сразу все записи - например, после перечитывания
+    файла, измененного другим процессом. Счетчики живут в памяти
+    процесса, поэтому в ETag они идут вместе с идентификатором запуска.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counter = 0
+        self._base = (0, time.time())
+        self._versions = {}
+
+    def bump(self, key=None):
+        """Отмечает изменение записи key"""
+        with self._lock:
+            self._counter += 1
+            self._versions[key] = (self._counter, time.time())
+
+    def reset(self):
+        """Отмечает изменение всех записей"""
+        with self._lock:
+            self._counter += 1
+            self._base = (self._counter, time.time())
+            self._versions = {}
+
+    def get(self, key=None) -> tuple:
+        """Возвращает (номер версии, время изменения) записи key"""
+        return self._versions.get(key, self._base)